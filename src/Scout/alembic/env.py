@@ -5,6 +5,11 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from Scout import config as scout_config
+from Scout.database import db
+from Scout.database import models  # noqa: F401 (registers the tables with the metadata)
+from Scout.database.base import Base
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -14,11 +19,7 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-# add your model's MetaData object here
-# for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -26,6 +27,20 @@ target_metadata = None
 # ... etc.
 
 
+def get_url() -> str:
+    """Gets the database url from the ini file, or from Scout's configuration if it isn't set there."""
+    if url := config.get_main_option("sqlalchemy.url"):
+        return url
+
+    configuration = scout_config.load_configuration()
+    return db.db_url(dialect=configuration["DB_DIALECT"],
+                     driver=configuration.get("DB_DRIVER", None),
+                     table=configuration.get("DB_TABLE", None),
+                     login=configuration.get("DB_LOGIN", {'user': None, 'password': None}),
+                     connect=configuration.get("DB_CONN", {'host': None, 'port': None})
+                     ).render_as_string(hide_password=False)
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -38,7 +53,7 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
+    url = get_url()
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -55,10 +70,21 @@ def run_migrations_online() -> None:
 
     In this scenario we need to create an Engine
     and associate a connection with the context.
+    When run by Scout itself, the connection to use
+    is passed in through the config's attributes.
 
     """
+    if (connection := config.attributes.get("connection", None)) is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
+        {**config.get_section(config.config_ini_section, {}), "sqlalchemy.url": get_url()},
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
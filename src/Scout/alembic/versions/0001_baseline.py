@@ -0,0 +1,110 @@
+"""The schema as created by Base.metadata.create_all before migrations were used.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('guilds',
+                    sa.Column('id', sa.Integer(), sa.Identity(always=False, increment=1), nullable=False),
+                    sa.Column('snowflake', sa.Integer(), nullable=False),
+                    sa.Column('override_discord_locale', sa.Boolean(), nullable=False),
+                    sa.Column('override_user_locales', sa.Boolean(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f('ix_guilds_snowflake'), 'guilds', ['snowflake'], unique=True)
+    op.create_table('meanings',
+                    sa.Column('id', sa.Integer(), sa.Identity(always=False, increment=1), nullable=False),
+                    sa.Column('meaning', sa.Text(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_table('regions',
+                    sa.Column('id', sa.Integer(), sa.Identity(always=False, increment=1), nullable=False),
+                    sa.Column('name', sa.String(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f('ix_regions_name'), 'regions', ['name'], unique=True)
+    op.create_table('users',
+                    sa.Column('id', sa.Integer(), sa.Identity(always=False, increment=1), nullable=False),
+                    sa.Column('snowflake', sa.Integer(), nullable=False),
+                    sa.Column('override_discord_locale', sa.Boolean(), nullable=False),
+                    sa.Column('override_server_locale', sa.Boolean(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('snowflake'))
+    op.create_table('guild_locale',
+                    sa.Column('guild_id', sa.Integer(), nullable=False),
+                    sa.Column('locale', sa.String(), nullable=False),
+                    sa.Column('priority', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id']),
+                    sa.PrimaryKeyConstraint('guild_id', 'locale', 'priority'))
+    op.create_table('guild_regions',
+                    sa.Column('region_id', sa.Integer(), nullable=False),
+                    sa.Column('guild_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id']),
+                    sa.ForeignKeyConstraint(['region_id'], ['regions.id']),
+                    sa.PrimaryKeyConstraint('region_id', 'guild_id'))
+    op.create_table('nations',
+                    sa.Column('id', sa.Integer(), sa.Identity(always=False, increment=1), nullable=False),
+                    sa.Column('name', sa.String(), nullable=False),
+                    sa.Column('private', sa.Boolean(), nullable=False),
+                    sa.Column('added_on', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+                    sa.Column('region_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['region_id'], ['regions.id']),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index(op.f('ix_nations_name'), 'nations', ['name'], unique=True)
+    op.create_table('roles',
+                    sa.Column('id', sa.Integer(), sa.Identity(always=False, increment=1), nullable=False),
+                    sa.Column('snowflake', sa.Integer(), nullable=False),
+                    sa.Column('guild_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['guild_id'], ['guilds.id']),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_table('user_locales',
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('locale', sa.String(), nullable=False),
+                    sa.Column('priority', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+                    sa.PrimaryKeyConstraint('user_id', 'locale', 'priority'))
+    op.create_table('user_names',
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('name', sa.String(), nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+                    sa.PrimaryKeyConstraint('user_id', 'name'))
+    op.create_table('role_meanings',
+                    sa.Column('meaning_id', sa.Integer(), nullable=False),
+                    sa.Column('role_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['meaning_id'], ['meanings.id']),
+                    sa.ForeignKeyConstraint(['role_id'], ['roles.id']),
+                    sa.PrimaryKeyConstraint('meaning_id', 'role_id'))
+    op.create_table('user_nations',
+                    sa.Column('nation_id', sa.Integer(), nullable=False),
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['nation_id'], ['nations.id']),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+                    sa.PrimaryKeyConstraint('nation_id', 'user_id'))
+
+
+def downgrade() -> None:
+    op.drop_table('user_nations')
+    op.drop_table('role_meanings')
+    op.drop_table('user_names')
+    op.drop_table('user_locales')
+    op.drop_table('roles')
+    op.drop_index(op.f('ix_nations_name'), table_name='nations')
+    op.drop_table('nations')
+    op.drop_table('guild_regions')
+    op.drop_table('guild_locale')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_regions_name'), table_name='regions')
+    op.drop_table('regions')
+    op.drop_index(op.f('ix_guilds_snowflake'), table_name='guilds')
+    op.drop_table('guilds')
+    op.drop_table('meanings')
@@ -0,0 +1,38 @@
+"""Add indexes for the roles, meanings, locales and association table lookups done on every member event.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_roles_snowflake'), 'roles', ['snowflake'], unique=False)
+    op.create_index(op.f('ix_roles_guild_id'), 'roles', ['guild_id'], unique=False)
+    op.create_index('ix_meanings_meaning', 'meanings', ['meaning'], unique=False, mysql_length=255)
+    op.create_index('ix_user_locales_user_id_priority', 'user_locales', ['user_id', 'priority'], unique=False)
+    op.create_index('ix_guild_locale_guild_id_priority', 'guild_locale', ['guild_id', 'priority'], unique=False)
+    op.create_index(op.f('ix_user_nations_user_id'), 'user_nations', ['user_id'], unique=False)
+    op.create_index(op.f('ix_guild_regions_guild_id'), 'guild_regions', ['guild_id'], unique=False)
+    op.create_index(op.f('ix_role_meanings_role_id'), 'role_meanings', ['role_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_role_meanings_role_id'), table_name='role_meanings')
+    op.drop_index(op.f('ix_guild_regions_guild_id'), table_name='guild_regions')
+    op.drop_index(op.f('ix_user_nations_user_id'), table_name='user_nations')
+    op.drop_index('ix_guild_locale_guild_id_priority', table_name='guild_locale')
+    op.drop_index('ix_user_locales_user_id_priority', table_name='user_locales')
+    op.drop_index('ix_meanings_meaning', table_name='meanings')
+    op.drop_index(op.f('ix_roles_guild_id'), table_name='roles')
+    op.drop_index(op.f('ix_roles_snowflake'), table_name='roles')
@@ -20,6 +20,8 @@ def default_values() -> dict[str, str]:
         "PING_PREFIX": "True",
         "DB_DIALECT": "sqlite",
         "REGION": "",
+        "METRICS_HOST": "127.0.0.1",
+        "METRICS_PORT": "",
     }
 
 
@@ -61,6 +63,11 @@ def toml_flatten(toml_config):
         except ValueError:
             return None
 
+    def check_min(value: Optional[int], minimum: int, name: str = "") -> Optional[int]:
+        if value is not None and value < minimum:
+            raise ValueError("{} must be at least {}".format(name, minimum))
+        return value
+
     def str_to_opt_str(value: str) -> Optional[str]:
         match value.strip():
             case '':
@@ -68,6 +75,13 @@ def toml_flatten(toml_config):
             case _:
                 return value
 
+    def pool_config(pool: dict) -> dict[str, Optional[int | bool]]:
+        return {'size': str_to_opt_int(str(pool.get('SIZE', ''))),
+                'max_overflow': str_to_opt_int(str(pool.get('MAX_OVERFLOW', ''))),
+                'timeout': str_to_opt_int(str(pool.get('TIMEOUT', ''))),
+                'recycle': str_to_opt_int(str(pool.get('RECYCLE', ''))),
+                'pre_ping': pool.get('PRE_PING', None) if isinstance(pool.get('PRE_PING', None), bool) else None}
+
     return {
         "PREFIXES": toml_config['bot']['commands']['PREFIXES'],
         "PREFIXLESS_DMS": toml_config['bot']['commands']['ALLOW_PREFIXLESS_IN_DMS'],
@@ -76,11 +90,24 @@ def toml_flatten(toml_config):
         "NATION": check_str(toml_config['bot']['api']['n']['NATION'], 'api.n.NATION'),
         "CONTACT_INFO": check_str(toml_config['bot']['api']['n']['CONTACT_INFO'], "api.n.CONTACT_INFO"),
         "REGION": str_to_opt_str(toml_config['bot']['api']['n']['REGION']),
+        "NS_CACHE_FILE": str_to_opt_str(toml_config['bot']['api']['n'].get('CACHE_FILE', '')),
         "DB_DIALECT": check_str(toml_config['bot']['database']['sql']['DIALECT'], "database.sql.DIALECT"),
         "DB_DRIVER": str_to_opt_str(toml_config['bot']['database']['sql']['DRIVER']),
+        "DB_ASYNC_DRIVER": str_to_opt_str(toml_config['bot']['database']['sql'].get('ASYNC_DRIVER', '')),
         "DB_TABLE": str_to_opt_str(toml_config['bot']['database']['sql']['TABLE']),
         "DB_LOGIN": toml_config['bot']['database']['sql']['LOGIN'],
-        "DB_CONN": toml_config['bot']['database']['sql']['CONNECTION']
+        "DB_CONN": toml_config['bot']['database']['sql']['CONNECTION'],
+        "DB_POOL": pool_config(toml_config['bot']['database']['sql'].get('POOL', {})),
+        "DB_STATEMENT_TIMEOUT": str_to_opt_int(str(toml_config['bot']['database']['sql'].get('STATEMENT_TIMEOUT',
+                                                                                             ''))),
+        "TRANSLATIONS_CACHE_FILE": str_to_opt_str(toml_config['bot'].get('translations', {}).get('CACHE_FILE', '')),
+        "TRANSLATIONS_MAX_LOCALES": check_min(str_to_opt_int(str(toml_config['bot'].get('translations', {})
+                                                                 .get('MAX_LOCALES', ''))), 1,
+                                              "translations.MAX_LOCALES"),
+        "TRANSLATIONS_WATCH_SECONDS": str_to_opt_int(str(toml_config['bot'].get('translations', {})
+                                                         .get('WATCH_SECONDS', ''))),
+        "METRICS_HOST": toml_config['bot'].get('metrics', {}).get('HOST', '127.0.0.1'),
+        "METRICS_PORT": str_to_opt_int(str(toml_config['bot'].get('metrics', {}).get('PORT', ''))),
     }
 
 
@@ -108,14 +135,29 @@ def pythonize_env(env_config):
             case _:
                 return value
 
+    def str_to_opt_int(value: Optional[str]) -> Optional[int]:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def check_min(value: Optional[int], minimum: int, name: str = "") -> Optional[int]:
+        if value is not None and value < minimum:
+            raise ValueError("{} must be at least {}".format(name, minimum))
+        return value
+
     for (key, val) in env_config.items():
         match key:
             case "PREFIXES":
                 env_config[key] = [k for k in val.split(":") if k]
             case "PREFIXLESS_DMS" | "PING_PREFIX":
                 env_config[key] = str_to_bool(val)
-            case "REGION" | "DB_DRIVER" | "TABLE":
+            case "REGION" | "DB_DRIVER" | "DB_ASYNC_DRIVER" | "TABLE" | "NS_CACHE_FILE" | "TRANSLATIONS_CACHE_FILE":
                 env_config[key] = str_to_opt_str(val)
+            case "METRICS_PORT" | "DB_STATEMENT_TIMEOUT" | "TRANSLATIONS_WATCH_SECONDS":
+                env_config[key] = str_to_opt_int(val)
+            case "TRANSLATIONS_MAX_LOCALES":
+                env_config[key] = check_min(str_to_opt_int(val), 1, key)
             case "DB_LOGIN":
                 env_config[key] = {'user': val.split(":")[0], 'password': val.split(":")[1]}
             case "DB_CONN":
@@ -142,6 +184,14 @@ def pythonize_env(env_config):
                                      'port': int(env_config.get("DB_PORT", None))}
         except TypeError:
             env_config["DB_CONN"] = {'host': env_config.get("DB_HOST", None), 'port': None}
+
+    if "DB_POOL" not in env_config:
+        pre_ping = env_config.get("DB_POOL_PRE_PING", None)
+        env_config["DB_POOL"] = {'size': str_to_opt_int(env_config.get("DB_POOL_SIZE", None)),
+                                 'max_overflow': str_to_opt_int(env_config.get("DB_POOL_MAX_OVERFLOW", None)),
+                                 'timeout': str_to_opt_int(env_config.get("DB_POOL_TIMEOUT", None)),
+                                 'recycle': str_to_opt_int(env_config.get("DB_POOL_RECYCLE", None)),
+                                 'pre_ping': str_to_bool(pre_ping) if pre_ping is not None else None}
     return env_config
 
 
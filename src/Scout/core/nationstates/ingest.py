@@ -0,0 +1,107 @@
+"""
+Ingestion of the NationStates daily data dumps into the database.
+
+This keeps the region of every nation we know about up to date without using any of the API's rate limit, which is
+better suited for large deployments than polling. It can be run on its own with:
+
+    python -m Scout.core.nationstates.ingest nations.xml.gz [regions.xml.gz ...]
+"""
+import itertools
+import logging
+import os
+import sys
+from collections.abc import Iterable
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from Scout import config
+from Scout.database import db
+from Scout.ns_api import dump
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+
+def _normalize(name: str) -> str:
+    return name.replace(" ", "_").casefold()
+
+
+def ingest(residency: Iterable[tuple[str, str]], engine: Engine, *, batch_size: int = BATCH_SIZE) -> int:
+    """ Updates the region of every known nation from (nation, region) pairs.
+
+    Only nations that are already in the database are updated, as those are the nations that have been verified.
+    Regions that are not yet in the database are added as needed. Every batch of pairs is written in its own
+    transaction.
+
+    Args:
+        residency: The name of each nation and the name of the region it is in.
+        engine: The database engine to use.
+        batch_size: The amount of pairs to handle per transaction.
+
+    Returns:
+        The amount of nations that moved regions.
+    """
+    with Session(engine) as session:
+        known = {_normalize(name): (nation_id, region_id)
+                 for nation_id, name, region_id in db.get_nation_regions(session=session)}
+    if not known:
+        return 0
+
+    moved = 0
+    relevant = ((_normalize(n), r) for n, r in residency if _normalize(n) in known)
+    while batch := list(itertools.islice(relevant, batch_size)):
+        with Session(engine) as session:
+            names = {region_name for _, region_name in batch}
+            region_dbs = db.get_regions_by_names(names, session=session)
+            for name in names - region_dbs.keys():
+                region_dbs[name] = db.register_region(name, session=session)
+            session.flush()
+
+            regions = {name: region.id for name, region in region_dbs.items()}
+            changes: dict[int, int] = {}
+            for nation, region_name in batch:
+                nation_id, region_id = known[nation]
+                if regions[region_name] != region_id:
+                    changes[nation_id] = regions[region_name]
+                    known[nation] = (nation_id, regions[region_name])
+
+            db.update_nation_regions(changes, session=session)
+            session.commit()
+            moved += len(changes)
+    return moved
+
+
+def ingest_dump(path: str | os.PathLike, engine: Engine, *, batch_size: int = BATCH_SIZE) -> int:
+    """ Ingests a nations or regions data dump, depending on its name.
+
+    Args:
+        path: The path to the dump, if the file name starts with `regions` it is read as a regions dump.
+        engine: The database engine to use.
+        batch_size: The amount of nations to handle per transaction.
+
+    Returns:
+        The amount of nations that moved regions.
+    """
+    if os.path.basename(os.fspath(path)).casefold().startswith("regions"):
+        return ingest(dump.iter_regions(path), engine, batch_size=batch_size)
+    return ingest(dump.iter_nations(path), engine, batch_size=batch_size)
+
+
+def main(paths: list[str]):
+    configuration = config.load_configuration()
+    engine = db.db_connect(dialect=configuration["DB_DIALECT"],
+                           driver=configuration.get("DB_DRIVER", None),
+                           table=configuration.get("DB_TABLE", None),
+                           login=configuration.get("DB_LOGIN", {'user': None, 'password': None}),
+                           connect=configuration.get("DB_CONN", {'host': None, 'port': None}),
+                           pool=configuration.get("DB_POOL", None),
+                           statement_timeout=configuration.get("DB_STATEMENT_TIMEOUT", None))
+    for path in paths:
+        logger.info("Ingested %s: %d nations moved.", path, ingest_dump(path, engine))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+"""
+Batching of member joins, so a wave of joins is handled as a few batches instead of one at a time.
+"""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+import discord
+
+__all__ = ["JoinQueue"]
+
+logger = logging.getLogger(__name__)
+
+JoinHandler = Callable[[discord.Guild, list[discord.Member]], Awaitable[None]]
+
+
+class JoinQueue:
+    """ Collects joins per guild over a short window and hands them to a handler in batches.
+
+    The first join in a guild opens a window, and every join in that guild until it closes (or until `max_batch` joins
+    have been collected) goes into the same batch. Batches are handled by a fixed amount of workers, and once
+    `max_batches` batches are waiting `put` waits for room, so a flood of joins can't pile up unbounded work.
+
+    Attributes:
+        handler: The coroutine function called with the guild and the members that joined it.
+        window: How long, in seconds, to collect joins for before a batch is handled.
+        max_batch: The most members in one batch.
+        workers: The amount of batches that can be handled at once.
+    """
+    handler: JoinHandler
+    window: float
+    max_batch: int
+    workers: int
+
+    def __init__(self, handler: JoinHandler, *, window: float = 2.0, max_batch: int = 100, workers: int = 4,
+                 max_batches: int = 100):
+        self.handler = handler
+        self.window = window
+        self.max_batch = max_batch
+        self.workers = workers
+        self._pending: dict[int, list[discord.Member]] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._batches: asyncio.Queue[tuple[discord.Guild, list[discord.Member]]] = asyncio.Queue(max_batches)
+        self._workers: list[asyncio.Task] = []
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stops handling joins. Anything not yet handled is dropped."""
+        for task in (*self._timers.values(), *self._workers):
+            task.cancel()
+        await asyncio.gather(*self._timers.values(), *self._workers, return_exceptions=True)
+        self._timers.clear()
+        self._workers.clear()
+        self._pending.clear()
+
+    async def put(self, member: discord.Member):
+        """Adds a member that joined to their guild's current batch."""
+        pending = self._pending.setdefault(member.guild.id, [])
+        pending.append(member)
+        if len(pending) >= self.max_batch:
+            if (timer := self._timers.pop(member.guild.id, None)) is not None:
+                timer.cancel()
+            await self._flush(member.guild)
+        elif member.guild.id not in self._timers:
+            self._timers[member.guild.id] = asyncio.create_task(self._flush_later(member.guild))
+
+    async def _flush_later(self, guild: discord.Guild):
+        await asyncio.sleep(self.window)
+        del self._timers[guild.id]
+        await self._flush(guild)
+
+    async def _flush(self, guild: discord.Guild):
+        members: Optional[list[discord.Member]] = self._pending.pop(guild.id, None)
+        if members:
+            await self._batches.put((guild, members))
+
+    async def _work(self):
+        while True:
+            guild, members = await self._batches.get()
+            try:
+                await self.handler(guild, members)
+            except Exception:
+                logger.exception("Could not handle %d members joining guild %s", len(members), guild.id)
+            finally:
+                self._batches.task_done()
@@ -2,52 +2,182 @@
 This module contains all the stuff for NSVerify Functionality.
 """
 import asyncio
+import logging
 from typing import Optional, Any
 
 import discord
-from discord.ext import commands
-from sqlalchemy import select
+from discord.ext import commands, tasks
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 import Scout.exceptions
-from Scout.database import db, models
+from Scout.database import db, aiodb
 from Scout.ns_api import ns
+from Scout.ns_api.cache import PersistentCache
 from Scout.core.nationstates import __VERSION__
+from Scout.core.nationstates.joinqueue import JoinQueue
 from Scout.ns_api.nation import Nation
+from Scout.ns_api.exceptions import NationDoesNotExist, RegionDoesNotExist
+
+logger = logging.getLogger(__name__)
 
 VERIFIED = "verified"
 RESIDENT = "resident"
 
+RESIDENCY_SYNC_MINUTES = 30
+
+ROLE_EDIT_CONCURRENCY = 10
+"""
+How many guilds a user's roles are updated in at once. Discord rate limits member edits per guild, so edits in different
+guilds don't hold each other up, and discord.py waits out any limit that is hit.
+"""
+
+
+def desired_nsv_meaning(user_regions: Optional[set[int]], guild_regions: set[int]) -> Optional[str]:
+    """Works out which NSVerify role a user should have in a guild.
+
+    Arguments:
+        user_regions: The ids of the regions the user's nations are in, or None if the user has no nations.
+        guild_regions: The ids of the regions linked to the guild.
+
+    Returns:
+        The meaning of the role the user should have, if any.
+    """
+    if not user_regions:
+        return None
+    if user_regions & guild_regions:
+        return RESIDENT
+    return VERIFIED
+
 
 class NSVerify(commands.Cog):
     """
     NSVerify Cog
     """
     ns_client: ns.NationStatesClient
+    join_queue: JoinQueue
     users_verifying: dict[Any, Any] = {}
 
     def __init__(self, bot):
         self.scout = bot
-        self.scout.register_meaning("verified", suppress_error=True)
-        self.scout.register_meaning("resident", suppress_error=True)
 
     async def cog_load(self):
+        await self.scout.register_meaning_async(VERIFIED, suppress_error=True)
+        await self.scout.register_meaning_async(RESIDENT, suppress_error=True)
+
         user_agent = ns.create_user_agent(self.scout.config["CONTACT_INFO"],
                                           self.scout.config["NATION"],
                                           self.scout.config["REGION"])
         user_agent = "NSVerify-Cog/{} {}".format(__VERSION__, user_agent)
+
+        persistent_cache = None
+        if self.scout.config.get("NS_CACHE_FILE", None):
+            persistent_cache = PersistentCache(self.scout.config["NS_CACHE_FILE"])
+
         self.ns_client = await ns.NationStatesClient(self.scout.reusable_session,
-                                                     user_agent=user_agent).build()
+                                                     user_agent=user_agent,
+                                                     persistent_cache=persistent_cache,
+                                                     metrics=self.scout.metrics).build()
+        self.sync_residency.start()
+        self.join_queue = JoinQueue(self.verify_joined)
+        self.join_queue.start()
+
+    async def cog_unload(self):
+        self.sync_residency.cancel()
+        await self.join_queue.stop()
+        if self.ns_client.persistent_cache is not None:
+            self.ns_client.persistent_cache.close()
+
+    @tasks.loop(minutes=RESIDENCY_SYNC_MINUTES)
+    async def sync_residency(self):
+        """
+        Keeps the region of every known nation up to date, and updates the roles of anyone whose nation moved.
+
+        Each linked region's list of nations is fetched once, so this costs one request per linked region. Only nations
+        that left a linked region for somewhere unknown need to be looked up on their own. Nothing here is answered from
+        the caches, as acting on stale residency would give out the wrong roles, and any nation found to have moved is
+        dropped from them.
+        """
+        async with self.scout.session_maker() as session:
+            regions = {r.id: r.name for r in await aiodb.get_linked_regions(session=session)}
+            nations = await aiodb.get_nation_regions(session=session)
+
+        residents: dict[str, int] = {}
+        for region_id, region_name in regions.items():
+            try:
+                response = await self.ns_client.query(region=region_name, shards=("nations",), use_cache=False,
+                                                      priority=ns.Priority.BACKGROUND)
+            except RegionDoesNotExist:
+                await self.ns_client.invalidate_region(region_name)
+                continue
+            residents.update((n, region_id) for n in response.get("nations", ()))
+
+        linked = {ns.normalize_name(region_name): region_id for region_id, region_name in regions.items()}
+        moved: dict[int, int | str] = {}
+        names: dict[int, str] = {}
+        for nation_id, name, region_id in nations:
+            names[nation_id] = name
+            new_region = residents.get(ns.normalize_name(name))
+            if new_region is None and region_id in regions:
+                try:
+                    region_name = (await self.ns_client.get_nation(name, use_cache=False,
+                                                                   priority=ns.Priority.BACKGROUND)).region
+                except NationDoesNotExist:
+                    continue
+                if ns.normalize_name(region_name) == ns.normalize_name(regions[region_id]):
+                    continue
+                new_region = linked.get(ns.normalize_name(region_name), region_name)
+
+            if new_region is not None and new_region != region_id:
+                moved[nation_id] = new_region
+
+        if not moved:
+            return
 
-    def link_roles(self, verified_role: Optional[discord.Role], resident_role: Optional[discord.Role],
-                   guild: discord.Guild, overwrite: Optional[bool] = False) -> str:
+        for nation_id in moved:
+            await self.ns_client.invalidate_nation(names[nation_id])
+
+        async with self.scout.session_maker() as session:
+            new_names = {region for region in moved.values() if isinstance(region, str)}
+            new_regions = await aiodb.get_regions_by_names(new_names, session=session)
+            for name in new_names - new_regions.keys():
+                new_regions[name] = await aiodb.register_region(name, session=session)
+            await session.flush()
+            for nation_id, region in moved.items():
+                if isinstance(region, str):
+                    moved[nation_id] = new_regions[region].id
+
+            await aiodb.update_nation_regions(moved, session=session)
+            await session.commit()
+
+            snowflakes = await aiodb.get_nation_user_snowflakes(moved.keys(), session=session)
+            user_regions = await aiodb.get_user_region_ids(snowflakes, session=session)
+
+        for snowflake in snowflakes:
+            user = self.scout.get_user(snowflake)
+            if user is None:
+                continue
+            try:
+                await self.update_nsv_roles(user, user_regions.get(snowflake, None))
+            except (Scout.exceptions.NoGuilds, Scout.exceptions.NoRoles):
+                pass
+
+    async def link_nsv_roles(self, verified_role: Optional[discord.Role], resident_role: Optional[discord.Role],
+                             guild: discord.Guild, overwrite: Optional[bool] = False) -> str:
         if verified_role is None and resident_role is None:
             raise Scout.exceptions.NoRoles()
 
-        with Session(self.scout.engine) as session:
-            guild = db.get_guild(guild.id, session=session)
-            if resident_role is not None:
-                self.scout.add_role(resident_role, guild, RESIDENT.casefold(), override=overwrite, session=session)
+        roles = {meaning: role for meaning, role in ((VERIFIED, verified_role), (RESIDENT, resident_role))
+                 if role is not None}
+        async with self.scout.session_maker() as session:
+            guild_db = await aiodb.get_guild(guild.id, session=session)
+            for meaning, role in roles.items():
+                await aiodb.run_sync(self.scout.add_role, role, guild_db, meaning, override=overwrite,
+                                     session=session)
+            await session.commit()
+
+        for meaning, role in roles.items():
+            self.scout.role_index.add(guild.id, meaning, role.id)
 
         if verified_role is not None and resident_role is not None:
             return ("A Natural 20, a critical success! I've obtained the mythical +1 roles of {} and {}!"
@@ -63,22 +193,22 @@ class NSVerify(commands.Cog):
     @commands.guild_only()
     async def link_region(self, ctx, region_name: str, verified_role: Optional[discord.Role],
                           resident_role: Optional[discord.Role]):
-        region = await self.ns_client.get_region(region_name)
-        with Session(self.scout.engine) as session:
-            new_region = db.register_region(region.name, session=session)
-            new_guild = db.register_guild(guild_snowflake=ctx.guild.id, session=session)
-            db.link_guild_region(new_guild, new_region, session=session)
-            session.commit()  # flush?
+        region = await self.ns_client.get_region(region_name, priority=ns.Priority.INTERACTIVE)
+        async with self.scout.session_maker() as session:
+            new_region = await aiodb.get_region(region.name, session=session)
+            if new_region is None:
+                new_region = await aiodb.register_region(region.name, session=session)
+            new_guild = await aiodb.get_guild(ctx.guild.id, session=session)
+            if new_guild is None:
+                new_guild = await aiodb.register_guild(guild_snowflake=ctx.guild.id, session=session)
+            await aiodb.link_guild_region(new_guild, new_region, session=session)
+            await session.commit()
+            self.scout.role_index.link_region(ctx.guild.id, new_region.id)
 
             try:
-                self.link_roles(verified_role, resident_role, ctx.message, overwrite=False)
+                await self.link_nsv_roles(verified_role, resident_role, ctx.guild, overwrite=False)
                 await ctx.send("The region has been registered to this server along with the roles!")
-
-                users = session.scalars(select(models.User.snowflake)).all()
-                if users:
-                    members = await ctx.guild.query_members(user_ids=users)
-                    for member in members:
-                        await self.give_verified_roles(member, ctx.guild, session=session)
+                await self.reconcile_guild_roles(ctx.guild)
 
             except Scout.exceptions.NoRoles:
                 await ctx.send("I've added that world to my maps!")
@@ -96,14 +226,26 @@ class NSVerify(commands.Cog):
     @commands.check_any(commands.has_guild_permissions(administrator=True), commands.is_owner())
     @commands.guild_only()
     async def unlink_region(self, ctx, region_name: str):
-        with Session(self.scout.engine) as session:
-            ns_region = await self.ns_client.get_region(region_name.replace(" ", "_"))
+        def unlink(*, session: Session) -> Optional[int | bool]:
             region = db.get_region(ns_region.name, session=session)
-            guild = db.get_guild(ctx.guild.id, session=session)
-
-            if region is not None and guild is not None:
-                if region in guild.regions:
-                    db.unlink_guild_region(guild, region, session=session)
+            guild = db.get_guild(ctx.guild.id, load=("guild_regions",), session=session)
+
+            if region is None or guild is None:
+                return None
+            if region not in guild.regions:
+                return False
+            db.unlink_guild_region(guild, region, session=session)
+            return region.id
+
+        async with self.scout.session_maker() as session:
+            ns_region = await self.ns_client.get_region(region_name.replace(" ", "_"),
+                                                        priority=ns.Priority.INTERACTIVE)
+            unlinked = await aiodb.run_sync(unlink, session=session)
+            await session.commit()
+
+            if unlinked is not None:
+                if unlinked is not False:
+                    self.scout.role_index.unlink_region(ctx.guild.id, unlinked)
                     return await ctx.send("I've removed this region from my maps!")
                 return await ctx.send("I couldn't find that region...")
             await ctx.send("I couldn't find that region or guild...")
@@ -130,9 +272,9 @@ class NSVerify(commands.Cog):
         """
         Verifies a nation and assigns it to a user.
         """
-        nation = await self.ns_client.get_nation(nation.replace(" ", "_"))
-        with Session(self.scout.engine) as session:
-            if db.get_nation(nation.name, session=session):
+        nation = await self.ns_client.get_nation(nation.replace(" ", "_"), priority=ns.Priority.INTERACTIVE)
+        async with self.scout.session_maker() as session:
+            if await aiodb.get_nation(nation.name, session=session):
                 await ctx.send("That nation has a character sheet already, silly!", ephemeral=True)
                 return
 
@@ -153,8 +295,9 @@ class NSVerify(commands.Cog):
                              ).format(code, ns_nation.name),
                             ephemeral=True)
 
-                with Session(self.scout.engine) as session:
+                async with self.scout.session_maker() as session:
                     await self.register_nation(ns_nation, ctx.message, session=session)
+                    await session.commit()
                     await message.edit(content="There we go! I'll give you roles now...")
 
                     await self.give_verified_roles(ctx.message.author, session=session)
@@ -177,13 +320,15 @@ class NSVerify(commands.Cog):
                 res, nation = await self._verify_nation(nation, message.content)
             await _message.edit(content=res)
 
-            async with message.channel.typing():
-                res = await self.scout.register_nation(nation, message)
-            await _message.edit(content=res)
+            async with self.scout.session_maker() as session:
+                async with message.channel.typing():
+                    res = await self.register_nation(nation, message, session=session)
+                    await session.commit()
+                await _message.edit(content=res)
 
-            async with message.channel.typing():
-                del self.users_verifying[message.author.name]
-                await self.scout.give_verified_roles(message.author)
+                async with message.channel.typing():
+                    del self.users_verifying[message.author.name]
+                    await self.give_verified_roles(message.author, session=session)
             await _message.edit(content="I've given you roles in all servers I can!")
         except Scout.exceptions.NoCode_NSVerify:
             await _message.edit(content="You need to give me the code")
@@ -198,28 +343,39 @@ class NSVerify(commands.Cog):
     @commands.hybrid_command()  # type: ignore
     @commands.guild_only()
     async def unverify_nation(self, ctx, nation_name: str):
-        with Session(self.scout.engine) as session:
-            user = db.get_user(ctx.author.id, session=session)
-
-            ns_nation = await self.scout.ns_client.get_nation(nation_name)
-            nation = db.get_nation(ns_nation.name, session=session)
+        def remove_nation(*, session: Session) -> bool:
+            user = db.get_user(ctx.author.id, load=("user_nations",), session=session)
+            nation = db.get_nation(ns_nation.name, load=("nation_users",), session=session)
 
             if nation is None or user is None or nation not in user.nations:
-                return
+                return False
 
             try:
                 user.nations.remove(nation)
             except (ValueError, KeyError):
                 pass
-            await self.give_verified_roles(ctx.author, session=session)
+            return True
 
-            if not nation.users:
+        def remove_orphans(*, session: Session):
+            user = db.get_user(ctx.author.id, load=("user_nations",), session=session)
+            nation = db.get_nation(ns_nation.name, load=("nation_users",), session=session)
+
+            if nation is not None and not nation.users:
                 session.delete(nation)
 
-            if not user.nations:
+            if user is not None and not user.nations:
                 session.delete(user)
 
-            session.commit()
+        async with self.scout.session_maker() as session:
+            ns_nation = await self.ns_client.get_nation(nation_name, priority=ns.Priority.INTERACTIVE)
+            if not await aiodb.run_sync(remove_nation, session=session):
+                return
+            await self.ns_client.invalidate_nation(ns_nation.name)
+            await session.flush()
+            await self.give_verified_roles(ctx.author, session=session)
+
+            await aiodb.run_sync(remove_orphans, session=session)
+            await session.commit()
         await ctx.send("I've removed your character sheet from my campaign notes.")
 
     @commands.hybrid_command()  # type: ignore
@@ -228,14 +384,9 @@ class NSVerify(commands.Cog):
     async def link_roles(self, ctx, verified_role: Optional[discord.Role], resident_role: Optional[discord.Role],
                          overwrite_roles: Optional[bool] = False):
         try:
-            await ctx.send(self.link_roles(verified_role, resident_role, ctx.message, overwrite=overwrite_roles))
-
-            with Session(self.scout.engine) as session:
-                users = session.scalars(select(models.User.snowflake)).all()
-                if users:
-                    members = await ctx.guild.query_members(user_ids=users)
-                    for member in members:
-                        await self.give_verified_roles(member, ctx.guild, session=session)
+            await ctx.send(await self.link_nsv_roles(verified_role, resident_role, ctx.guild,
+                                                     overwrite=overwrite_roles))
+            await self.reconcile_guild_roles(ctx.guild)
 
         except Scout.exceptions.NoRoles:
             await ctx.send("I don't know why you're trying to add roles without giving me any...")
@@ -255,9 +406,9 @@ class NSVerify(commands.Cog):
     async def unlink_roles(self, ctx, verified_role: Optional[discord.Role], resident_role: Optional[discord.Role],
                            remove_roles: Optional[bool] = True):
         unlinked_roles: list[discord.Role] = []
-        if verified_role and (res := self.scout.remove_role(verified_role)) is not None:
+        if verified_role and (res := await self.scout.remove_role(verified_role)) is not None:
             unlinked_roles.append(res)
-        if resident_role and (res := self.scout.remove_role(resident_role)) is not None:
+        if resident_role and (res := await self.scout.remove_role(resident_role)) is not None:
             unlinked_roles.append(res)
 
         if remove_roles:
@@ -270,34 +421,29 @@ class NSVerify(commands.Cog):
             await ctx.send("You didn't give me any valid roles to remove from notes!...")
 
     @staticmethod
-    async def register_nation(nation: Nation, message: discord.Message, *, session: Session) -> str:
-        region = db.get_region(nation.region, session=session)
+    async def register_nation(nation: Nation, message: discord.Message, *, session: AsyncSession) -> str:
+        region = await aiodb.get_region(nation.region, session=session)
         if region is None:
-            region = db.register_region(nation.region, session=session)
+            region = await aiodb.register_region(nation.region, session=session)
 
-        user = db.register_user(message.author.id, session=session)
-        nation = db.register_nation(nation.name, region_info=region, session=session)
-        db.link_user_nation(user, nation, session=session)
+        user = await aiodb.get_user(message.author.id, snowflake_only=True, session=session)
+        if user is None:
+            user = await aiodb.register_user(message.author.id, session=session)
+        nation = await aiodb.register_nation(nation.name, region_info=region, session=session)
+        await aiodb.link_user_nation(user, nation, session=session)
         return "There we go! I'll see if I can get you some roles..."
 
-    @staticmethod
-    async def eligible_nsv_role(user: discord.Member, guild: models.Guild, session: Session) -> str | None:
-        eligible_role = None
-        user_db = db.get_user(user.id, session=session)
-
-        if guild is None or user_db is None:
-            return None
-
-        if user is not None:
-            eligible_role = VERIFIED
-
-        if guild.regions & {n.region for n in user_db.nations}:
-            eligible_role = RESIDENT
+    def nsv_roles(self, guild: int) -> dict[str, int]:
+        """Returns the snowflake of each of the guild's NSVerify roles, keyed by meaning."""
+        roles = self.scout.role_index.roles(guild)
+        return {meaning: roles[meaning] for meaning in (VERIFIED, RESIDENT) if meaning in roles}
 
-        return eligible_role
+    def eligible_nsv_role(self, user_regions: Optional[set[int]], guild: int) -> str | None:
+        """Works out which NSVerify role a user with nations in the given regions should have in a guild."""
+        return desired_nsv_meaning(user_regions, self.scout.role_index.regions(guild))
 
     @staticmethod
-    async def ineligible_nsv_roles(eligible_role: str | None) -> list[str]:
+    def ineligible_nsv_roles(eligible_role: str | None) -> list[str]:
         if eligible_role == RESIDENT:
             return [VERIFIED]
         elif eligible_role == VERIFIED:
@@ -305,49 +451,150 @@ class NSVerify(commands.Cog):
         else:
             return [RESIDENT, VERIFIED]
 
-    async def give_verified_roles(self, user: discord.User | discord.Member, guild: Optional[discord.Guild] = None,
-                                  *, session: Session):
-        if not session.scalars(select(models.Role)).all():
+    def nsv_role_changes(self, user_regions: Optional[set[int]], guilds: list[int], *,
+                         raise_no_guilds: bool) -> dict[int, tuple[Optional[int], list[int]]]:
+        """Works out which NSVerify roles a user should be given and have removed in each guild.
+
+        Arguments:
+            user_regions: The ids of the regions the user's nations are in, or None if the user has no nations.
+            guilds: The snowflakes of the guilds to check.
+            raise_no_guilds: Whether to raise NoGuilds if none of the guilds have NSVerify roles.
+
+        Returns:
+            The snowflake of the role to add, if any, and the snowflakes of the roles to remove, keyed by guild
+            snowflake.
+        """
+        if not len(self.scout.role_index):
             raise Scout.exceptions.NoRoles()
 
-        user_db = db.get_user(user.id, session=session)
-        if user_db is None or not user_db.nations:
-            return
+        if not user_regions:
+            return {}
 
-        mutual_guilds = {}
-        active_guilds = []
-        if guild is None:
-            mutual_guilds = {g.id: (g, m) for g in self.scout.guilds if (m := await g.fetch_member(user.id))}
-            active_guilds = session.scalars(
-                select(models.Guild).where(models.Guild.snowflake.in_(mutual_guilds.keys()))).all()
-            if not active_guilds:
-                raise Scout.exceptions.NoGuilds()
+        active_guilds = {guild: roles for guild in guilds if (roles := self.nsv_roles(guild))}
+        if not active_guilds and raise_no_guilds:
+            raise Scout.exceptions.NoGuilds()
 
-        else:
-            mutual_guilds[guild.id] = user
-            active_guilds = [db.get_guild(guild.id, session=session)]
-            active_guilds = [g for g in active_guilds if g is not None]
-            if not active_guilds:
-                return
+        changes = {}
+        for guild, roles in active_guilds.items():
+            eligible_role = self.eligible_nsv_role(user_regions, guild)
+            ineligible_roles = self.ineligible_nsv_roles(eligible_role)
+            changes[guild] = (roles.get(eligible_role, None) if eligible_role is not None else None,
+                              [roles[r] for r in ineligible_roles if r in roles])
+        return changes
 
-        for active_guild in active_guilds:
-            if mutual_guilds[active_guild.snowflake][1] is None or not active_guild.roles:
+    async def reconcile_guild_roles(self, guild: discord.Guild) -> int:
+        """Brings the NSVerify roles of every member in a guild in line with the database.
+
+        The guild's members are fetched first if they aren't all cached, and the regions of those members are then
+        loaded in a single query, with the guild's roles and regions coming from the role index. The role each member
+        should have is worked out in memory, and only the members whose roles are wrong are edited. Members that hold an
+        NSVerify role without having any nations have it removed. A member that can't be edited is logged and skipped.
+
+        Arguments:
+            guild: The guild to reconcile.
+
+        Returns:
+            The amount of members whose roles were changed.
+        """
+        managed = self.nsv_roles(guild.id)
+        if not managed:
+            raise Scout.exceptions.NoRoles()
+        managed_snowflakes = set(managed.values())
+        guild_regions = self.scout.role_index.regions(guild.id)
+
+        if not guild.chunked:
+            await guild.chunk()
+        members = {member.id: member for member in guild.members}
+        async with self.scout.session_maker() as session:
+            user_regions = await aiodb.get_user_region_ids(members.keys(), session=session)
+
+        changed = 0
+        for snowflake, member in members.items():
+            regions = user_regions.get(snowflake, None)
+            if regions is None and managed_snowflakes.isdisjoint(r.id for r in member.roles):
                 continue
+            meaning = desired_nsv_meaning(regions, guild_regions)
+            desired = {managed[meaning]} if meaning in managed else set()
+            try:
+                changed += await self.apply_nsv_roles(member, desired, managed_snowflakes)
+            except discord.HTTPException:
+                logger.exception("Could not update the roles of %s in guild %s", snowflake, guild.id)
+        return changed
+
+    async def apply_nsv_roles(self, member: discord.Member, desired: set[int], managed: set[int]) -> bool:
+        """Gives a member exactly the desired roles out of the managed ones, leaving every other role alone.
+
+        The member's cached roles are compared against what they should be, and all the changes are made in a single
+        edit. If nothing would change no request is made at all.
+
+        Metrics:
+            nsverify_role_edits_attempted: The amount of members that were edited.
+            nsverify_role_edits_skipped: The amount of members that already had the right roles.
 
-            user = mutual_guilds[active_guild.snowflake][1]
+        Arguments:
+            member: The member to update.
+            desired: The snowflakes of the managed roles the member should have.
+            managed: The snowflakes of every role NSVerify manages in the member's guild.
 
-            eligible_roles = await self.eligible_nsv_role(user, active_guild, session=session)
-            ineligible_roles = await self.ineligible_nsv_roles(eligible_roles)
-            eligible_discord = discord.Object(db.get_guildrole_with_meaning(active_guild,
-                                                                            eligible_roles,
-                                                                            session=session).snowflake)
+        Returns:
+            Whether the member was edited.
+        """
+        default_role = member.guild.id
+        current = {r.id for r in member.roles} - {default_role}
+        target = ((current - managed) | desired) - {default_role}
+
+        if target == current:
+            self.scout.metrics.increment("nsverify_role_edits_skipped")
+            return False
 
-            ineligible_db = [db.get_guildrole_with_meaning(active_guild, r, session=session)
-                             for r in ineligible_roles]
-            discord_roles = [discord.Object(r.snowflake) for r in ineligible_db if r is not None]
+        self.scout.metrics.increment("nsverify_role_edits_attempted")
+        await member.edit(roles=[discord.Object(r) for r in target])
+        return True
 
-            await user.add_roles(eligible_discord)
-            await user.remove_roles(*discord_roles)
+    @staticmethod
+    async def get_member(guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """Gets a member from the cache, only asking Discord if the guild's members aren't all cached."""
+        if (member := guild.get_member(user_id)) is not None or guild.chunked:
+            return member
+        try:
+            return await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+
+    async def give_verified_roles(self, user: discord.User | discord.Member, guild: Optional[discord.Guild] = None,
+                                  *, session: AsyncSession):
+        """Updates a user's NSVerify roles in a guild, or in every guild they share with the bot if none is given.
+
+        The roles are worked out for every guild first, so members are only looked up in guilds that have NSVerify
+        roles, and the guilds are then updated concurrently.
+        """
+        user_regions = (await aiodb.get_user_region_ids([user.id], session=session)).get(user.id, None)
+        await self.update_nsv_roles(user, user_regions, guild)
+
+    async def update_nsv_roles(self, user: discord.User | discord.Member, user_regions: Optional[set[int]],
+                               guild: Optional[discord.Guild] = None):
+        """The same as `give_verified_roles`, for when the regions of the user's nations are already known."""
+        guilds = {g.id: g for g in self.scout.guilds} if guild is None else {guild.id: guild}
+        changes = self.nsv_role_changes(user_regions, list(guilds.keys()), raise_no_guilds=guild is None)
+
+        semaphore = asyncio.Semaphore(ROLE_EDIT_CONCURRENCY)
+
+        async def apply(guild_snowflake: int, eligible: Optional[int], ineligible: list[int]):
+            async with semaphore:
+                if guild is not None and isinstance(user, discord.Member):
+                    member = user
+                else:
+                    member = await self.get_member(guilds[guild_snowflake], user.id)
+                if member is None:
+                    return
+
+                desired = {eligible} if eligible is not None else set()
+                try:
+                    await self.apply_nsv_roles(member, desired, desired | set(ineligible))
+                except discord.HTTPException:
+                    logger.exception("Could not update the roles of %s in guild %s", user.id, guild_snowflake)
+
+        await asyncio.gather(*(apply(g, eligible, ineligible) for g, (eligible, ineligible) in changes.items()))
 
     async def _verify_nation(self, nation: Nation | str, code: Optional[str]) -> tuple[str, Nation]:
         if code is None:
@@ -356,6 +603,8 @@ class NSVerify(commands.Cog):
         response, nation = await self.ns_client.verify(nation, code)
         if not response:
             raise Scout.exceptions.InvalidCode_NSVerify(code)
+        # The nation is about to be linked to a user, so it's looked up afresh next time.
+        await self.ns_client.invalidate_nation(nation.name)
 
         return "You're verified! Let me put this character-sheet in my campaign binder.", nation
 
@@ -364,16 +613,35 @@ class NSVerify(commands.Cog):
         """
         Displays Verified Nations of a given user.
         """
-        with Session(self.scout.engine) as session:
-            user = db.get_user(ctx.message.author.id, snowflake_only=True, session=session)
-        if user is not None and user.nations:
-            await ctx.send('\n'.join([n.name for n in user.nations]), ephemeral=private_response)
+        async with self.scout.session_maker() as session:
+            users = await aiodb.get_users_by_snowflakes([ctx.message.author.id], session=session)
+        user = users.get(ctx.message.author.id, None)
+        nations = [n.name for n in user.nations] if user is not None else []
+        if nations:
+            await ctx.send('\n'.join(nations), ephemeral=private_response)
         await ctx.send("I don't have any nations for you!")
 
     @commands.Cog.listener('on_member_join')
     async def verify_on_join(self, member: discord.Member):
-        with Session(self.scout.engine) as session:
-            await self.give_verified_roles(member, member.guild, session=session)
+        await self.join_queue.put(member)
+
+    async def verify_joined(self, guild: discord.Guild, members: list[discord.Member]):
+        """Gives NSVerify roles to a batch of members that joined a guild, looking all of them up in one query."""
+        managed = self.nsv_roles(guild.id)
+        if not managed:
+            return
+
+        members_by_id = {member.id: member for member in members}
+        async with self.scout.session_maker() as session:
+            user_regions = await aiodb.get_user_region_ids(members_by_id.keys(), session=session)
+
+        for snowflake, regions in user_regions.items():
+            meaning = self.eligible_nsv_role(regions, guild.id)
+            desired = {managed[meaning]} if meaning in managed else set()
+            try:
+                await self.apply_nsv_roles(members_by_id[snowflake], desired, set(managed.values()))
+            except discord.HTTPException:
+                logger.exception("Could not update the roles of %s in guild %s", snowflake, guild.id)
 
 
 async def setup(bot):
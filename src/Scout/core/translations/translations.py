@@ -7,7 +7,7 @@ from discord.ext import commands
 from sqlalchemy.orm import Session
 
 import Scout.exceptions
-from Scout.database import db, models
+from Scout.database import db, aiodb, models
 
 PRIMARY = 1
 SECONDARY = 2
@@ -26,8 +26,8 @@ class Translations(commands.Cog):
         pass
 
     @staticmethod
-    async def update_locale(obj: models.Guild | models.User, priority: int, language: str | None,
-                            *, get_locale_priority, add_locale, get_locale_language, session: Session):
+    def update_locale(obj: models.Guild | models.User, priority: int, language: str | None,
+                      *, get_locale_priority, add_locale, get_locale_language, session: Session):
         """Provides a general interface for updating locale between servers and guilds.
 
         Arguments:
@@ -78,10 +78,10 @@ class Translations(commands.Cog):
             ctx.send(f"Language {language} not supported!")
             return
 
-        with Session(self.scout.engine) as session:
-            guild = db.get_guild(ctx.guild.snowflake, snowflake_only=True, session=session)
+        async with self.scout.session_maker() as session:
+            guild = await aiodb.get_guild(ctx.guild.snowflake, snowflake_only=True, session=session)
             if guild is None:
-                guild = db.register_guild(ctx.guild.snowflake, session=session)
+                guild = await aiodb.register_guild(ctx.guild.snowflake, session=session)
                 session.add(guild)
 
             original_discord = guild.override_discord_locale
@@ -89,17 +89,17 @@ class Translations(commands.Cog):
             guild.override_discord_locale = original_discord if override_locale is None else override_locale
             guild.restrict_user_locale = original_user if restrict_user_locales is None else restrict_user_locales
 
-            await self.update_locale(guild, PRIMARY, language,
-                                     add_locale=db.add_server_locale,
-                                     get_locale_language=db.get_server_locale_with_language,
-                                     get_locale_priority=db.get_server_locale_with_priority,
-                                     session=session)
-            await self.update_locale(guild, SECONDARY, fallback_language,
-                                     add_locale=db.add_server_locale,
-                                     get_locale_language=db.get_server_locale_with_language,
-                                     get_locale_priority=db.get_server_locale_with_priority,
-                                     session=session)
-            session.commit()
+            await aiodb.run_sync(self.update_locale, guild, PRIMARY, language,
+                                 add_locale=db.add_server_locale,
+                                 get_locale_language=db.get_server_locale_with_language,
+                                 get_locale_priority=db.get_server_locale_with_priority,
+                                 session=session)
+            await aiodb.run_sync(self.update_locale, guild, SECONDARY, fallback_language,
+                                 add_locale=db.add_server_locale,
+                                 get_locale_language=db.get_server_locale_with_language,
+                                 get_locale_priority=db.get_server_locale_with_priority,
+                                 session=session)
+            await session.commit()
 
     @commands.hybrid_command()  # type: ignore
     async def set_language(self, ctx, language: str, fallback_language: Optional[str] = None,
@@ -126,10 +126,10 @@ class Translations(commands.Cog):
             ctx.send(f"Language {fallback_language} not supported!")
             return
 
-        with Session(self.scout.engine) as session:
-            user = db.get_user(ctx.user.snowflake, session=session)
+        async with self.scout.session_maker() as session:
+            user = await aiodb.get_user(ctx.user.snowflake, session=session)
             if user is None:
-                user = db.register_user(ctx.user.snowflake, session=session)
+                user = await aiodb.register_user(ctx.user.snowflake, session=session)
                 session.add(user)
 
             original_discord = user.override_discord_locale
@@ -137,17 +137,17 @@ class Translations(commands.Cog):
             user.override_discord_locale = original_discord if override_locale is None else override_locale
             user.restrict_server_locale = original_server if use_in_servers is None else use_in_servers
 
-            await self.update_locale(user, PRIMARY, language,
-                                     add_locale=db.add_user_locale,
-                                     get_locale_language=db.get_user_locale_with_language,
-                                     get_locale_priority=db.get_user_locale_with_priority,
-                                     session=session)
-            await self.update_locale(user, SECONDARY, fallback_language,
-                                     add_locale=db.add_user_locale,
-                                     get_locale_language=db.get_user_locale_with_language,
-                                     get_locale_priority=db.get_user_locale_with_priority,
-                                     session=session)
-            session.commit()
+            await aiodb.run_sync(self.update_locale, user, PRIMARY, language,
+                                 add_locale=db.add_user_locale,
+                                 get_locale_language=db.get_user_locale_with_language,
+                                 get_locale_priority=db.get_user_locale_with_priority,
+                                 session=session)
+            await aiodb.run_sync(self.update_locale, user, SECONDARY, fallback_language,
+                                 add_locale=db.add_user_locale,
+                                 get_locale_language=db.get_user_locale_with_language,
+                                 get_locale_priority=db.get_user_locale_with_priority,
+                                 session=session)
+            await session.commit()
 
 
 async def setup(bot):
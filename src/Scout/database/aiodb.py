@@ -0,0 +1,87 @@
+"""
+The async version of the `Scout.database.db` interface, for use with an `AsyncSession`.
+
+Every helper here runs its counterpart in `Scout.database.db` through `AsyncSession.run_sync`, so relationships can be
+lazy loaded within them. Outside of a helper relationships can not be lazy loaded, so anything that needs them should
+be done in a function passed to `run_sync`.
+"""
+from collections.abc import Callable
+from functools import wraps
+from typing import Any, TypeVar, ParamSpec, Awaitable
+
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, async_sessionmaker
+
+from Scout.database import db
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+def sessionmaker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    """
+    Creates the session factory for an engine. Objects are not expired on commit, as they can't be refreshed lazily.
+    """
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def run_sync(function: Callable[..., T], *args: Any, session: AsyncSession, **kwargs: Any) -> T:
+    """
+    Runs a function that takes a synchronous session (as the keyword argument `session`) with an AsyncSession.
+    """
+    return await session.run_sync(lambda sync_session: function(*args, session=sync_session, **kwargs))
+
+
+def _run_sync(function: Callable[P, T]) -> Callable[..., Awaitable[T]]:
+    @wraps(function)
+    async def wrapper(*args: Any, session: AsyncSession, **kwargs: Any) -> T:
+        return await run_sync(function, *args, session=session, **kwargs)
+    return wrapper
+
+
+register_user = _run_sync(db.register_user)
+register_nation = _run_sync(db.register_nation)
+remove_nation = _run_sync(db.remove_nation)
+link_user_nation = _run_sync(db.link_user_nation)
+unlink_user_nation = _run_sync(db.unlink_user_nation)
+
+register_guild = _run_sync(db.register_guild)
+remove_guild = _run_sync(db.remove_guild)
+
+register_region = _run_sync(db.register_region)
+remove_region = _run_sync(db.remove_region)
+link_guild_region = _run_sync(db.link_guild_region)
+unlink_guild_region = _run_sync(db.unlink_guild_region)
+
+register_role = _run_sync(db.register_role)
+remove_role = _run_sync(db.remove_role)
+update_role = _run_sync(db.update_role)
+
+add_role_meaning = _run_sync(db.add_role_meaning)
+register_role_meaning = _run_sync(db.register_role_meaning)
+link_role_meaning = _run_sync(db.link_role_meaning)
+
+get_user = _run_sync(db.get_user)
+get_guild = _run_sync(db.get_guild)
+get_region = _run_sync(db.get_region)
+get_nation = _run_sync(db.get_nation)
+get_role = _run_sync(db.get_role)
+get_meaning = _run_sync(db.get_meaning)
+get_guildrole_with_meaning = _run_sync(db.get_guildrole_with_meaning)
+
+get_users_by_snowflakes = _run_sync(db.get_users_by_snowflakes)
+get_nations_by_names = _run_sync(db.get_nations_by_names)
+get_regions_by_names = _run_sync(db.get_regions_by_names)
+
+get_linked_regions = _run_sync(db.get_linked_regions)
+get_nation_regions = _run_sync(db.get_nation_regions)
+get_nation_user_snowflakes = _run_sync(db.get_nation_user_snowflakes)
+update_nation_regions = _run_sync(db.update_nation_regions)
+
+get_user_region_ids = _run_sync(db.get_user_region_ids)
+
+add_user_locale = _run_sync(db.add_user_locale)
+get_user_locale_with_priority = _run_sync(db.get_user_locale_with_priority)
+get_user_locale_with_language = _run_sync(db.get_user_locale_with_language)
+add_server_locale = _run_sync(db.add_server_locale)
+get_server_locale_with_priority = _run_sync(db.get_server_locale_with_priority)
+get_server_locale_with_language = _run_sync(db.get_server_locale_with_language)
@@ -1,33 +1,180 @@
 """
 This is a more 'high level' of sorts DB interface.
 """
+import itertools
+from collections.abc import Mapping, Sequence, Iterable, Iterator
 from functools import wraps
-from typing import Optional, cast
+from typing import Any, Optional, TypeVar, cast
 
-from sqlalchemy import create_engine, select, or_, inspect
+from sqlalchemy import create_engine, select, update, or_, inspect, event, Engine, Row
 from sqlalchemy.engine import URL
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy.sql.base import ExecutableOption
+from sqlalchemy.pool import Pool
 
 import Scout.database.exceptions
 import Scout.database.models as models
+from Scout.database.pool import TimedQueuePool, TimedAsyncAdaptedQueuePool
+from Scout.metrics import MetricsSink
 
+T = TypeVar("T")
 
-def db_connect(dialect: str, driver: Optional[str], table: Optional[str], login: dict[str, Optional[str]],
-               connect: dict[str, Optional[str | int]]):
+IN_CHUNK_SIZE = 500
+"""The most values to put in a single IN (...) list, as databases limit how many parameters a statement can have."""
+
+LOADER_PROFILES: dict[str, tuple[ExecutableOption, ...]] = {
+    "user_nations": (selectinload(models.User.nations).joinedload(models.Nation.region),),
+    "nation_users": (selectinload(models.Nation.users),),
+    "nation_region": (joinedload(models.Nation.region),),
+    "guild_regions": (selectinload(models.Guild.regions),),
+    "role_meanings": (selectinload(models.Role.meanings),),
+}
+"""
+The relationships to load up front for each kind of lookup, by name. Pass the names of the relationships a caller is
+going to use as `load` to the getters, so they are loaded in a fixed amount of queries instead of one per access.
+"""
+
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "psycopg",
+    "mysql": "aiomysql",
+}
+"""The driver to use for each dialect with the async engine if one isn't specified."""
+
+
+def db_url(dialect: str, driver: Optional[str], table: Optional[str], login: dict[str, Optional[str]],
+           connect: dict[str, Optional[str | int]]) -> URL:
     """
-    Handles database connection stuff
+    Creates the database URL from the configuration.
     """
     driver_name = dialect
     if driver:
         driver_name = "{}+{}".format(driver_name, driver)
 
-    uri = URL.create(driver_name,
-                     username=login.get('user', None),
-                     password=login.get('password', None),
-                     host=cast(Optional[str], connect.get('host', None)),
-                     port=cast(Optional[int], connect.get('port', None)),
-                     database=table)
-    return create_engine(uri)
+    return URL.create(driver_name,
+                      username=login.get('user', None),
+                      password=login.get('password', None),
+                      host=cast(Optional[str], connect.get('host', None)),
+                      port=cast(Optional[int], connect.get('port', None)),
+                      database=table)
+
+
+def _engine_options(dialect: str, table: Optional[str], pool: Optional[Mapping[str, Optional[int | bool]]],
+                    poolclass: type[Pool]) -> dict[str, Any]:
+    """
+    Works out the keyword arguments for creating an engine from the pool configuration.
+    """
+    pool = pool if pool is not None else {}
+    if dialect == "sqlite" and (not table or table == ":memory:"):
+        # In memory databases only exist for as long as their connection does, so SQLAlchemy's default pool is kept.
+        return {}
+
+    options: dict[str, Any] = {"poolclass": poolclass}
+    for key, option in (('size', 'pool_size'), ('max_overflow', 'max_overflow'), ('timeout', 'pool_timeout'),
+                        ('recycle', 'pool_recycle'), ('pre_ping', 'pool_pre_ping')):
+        if pool.get(key, None) is not None:
+            options[option] = pool[key]
+    return options
+
+
+def _connect_args(dialect: str, driver: Optional[str], statement_timeout: Optional[int]) -> dict[str, Any]:
+    """
+    Works out the arguments to pass to the DBAPI's connect for settings that have to be part of the connection itself.
+
+    PostgreSQL's statement_timeout is given as a startup option, as a SET on a new connection happens inside of a
+    transaction that the pool rolls back on checkin, which would undo it.
+    """
+    if dialect == "postgresql" and statement_timeout is not None:
+        if driver == "asyncpg":
+            return {"server_settings": {"statement_timeout": "{:d}".format(statement_timeout)}}
+        return {"options": "-c statement_timeout={:d}".format(statement_timeout)}
+    return {}
+
+
+def _configure_connections(engine: Engine, dialect: str, statement_timeout: Optional[int]):
+    """
+    Sets up every new connection of the engine. SQLite uses WAL journaling with synchronous=NORMAL, which lets reads
+    happen alongside a write and only syncs on checkpoints. The statement timeout is in milliseconds, with SQLite it
+    is how long to wait on a locked database instead. PostgreSQL's statement timeout is set by `_connect_args`.
+    """
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, _connection_record):
+        statements = []
+        match dialect:
+            case "sqlite":
+                statements += ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"]
+                if statement_timeout is not None:
+                    statements.append("PRAGMA busy_timeout={:d}".format(statement_timeout))
+            case "mysql" | "mariadb" if statement_timeout is not None:
+                statements.append("SET SESSION max_execution_time = {:d}".format(statement_timeout))
+
+        if not statements:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def db_connect(dialect: str, driver: Optional[str], table: Optional[str], login: dict[str, Optional[str]],
+               connect: dict[str, Optional[str | int]], *, pool: Optional[Mapping[str, Optional[int | bool]]] = None,
+               statement_timeout: Optional[int] = None, metrics: Optional[MetricsSink] = None) -> Engine:
+    """
+    Handles database connection stuff
+
+    Arguments:
+        pool: The pool configuration, any of size, max_overflow, timeout, recycle and pre_ping.
+        statement_timeout: How long, in milliseconds, a statement may run.
+        metrics: Where to report connection pool checkout times.
+    """
+    options = _engine_options(dialect, table, pool, TimedQueuePool)
+    options["connect_args"] = _connect_args(dialect, driver, statement_timeout)
+    if dialect == "sqlite":
+        # Pooled connections are handed between threads, though only ever used by one at a time.
+        options["connect_args"]["check_same_thread"] = False
+
+    engine = create_engine(db_url(dialect, driver, table, login, connect), **options)
+    _configure_connections(engine, dialect, statement_timeout)
+    if metrics is not None and isinstance(engine.pool, TimedQueuePool):
+        engine.pool.metrics = metrics
+    return engine
+
+
+def db_connect_async(dialect: str, driver: Optional[str], table: Optional[str], login: dict[str, Optional[str]],
+                     connect: dict[str, Optional[str | int]], *,
+                     pool: Optional[Mapping[str, Optional[int | bool]]] = None,
+                     statement_timeout: Optional[int] = None, metrics: Optional[MetricsSink] = None) -> AsyncEngine:
+    """
+    Handles database connection stuff for the async engine. If no driver is given, the one from ASYNC_DRIVERS is used.
+    The other arguments are the same as with `db_connect`.
+    """
+    driver = driver if driver else ASYNC_DRIVERS.get(dialect, None)
+    engine = create_async_engine(db_url(dialect, driver, table, login, connect),
+                                 connect_args=_connect_args(dialect, driver, statement_timeout),
+                                 **_engine_options(dialect, table, pool, TimedAsyncAdaptedQueuePool))
+    _configure_connections(engine.sync_engine, dialect, statement_timeout)
+    if metrics is not None and isinstance(engine.pool, TimedAsyncAdaptedQueuePool):
+        engine.pool.metrics = metrics
+    return engine
+
+
+def loader_options(profiles: Iterable[str]) -> list[ExecutableOption]:
+    """
+    Gets the loader options for the given profiles from LOADER_PROFILES.
+    """
+    try:
+        return [option for profile in profiles for option in LOADER_PROFILES[profile]]
+    except KeyError as e:
+        raise ValueError("Unknown loader profile: {}".format(e.args[0])) from None
+
+
+def _chunked(values: Iterable[T], size: int = IN_CHUNK_SIZE) -> Iterator[list[T]]:
+    iterator = iter(values)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
 
 
 def readd(obj: object, session: Session) -> object:
@@ -177,31 +324,129 @@ def link_role_meaning(role: models.Role, meaning: models.Meaning, *, session: Se
     return role, meaning
 
 
-def get_user(user: int, *, snowflake_only=False, session: Session) -> models.User:
+def get_user(user: int, *, snowflake_only=False, load: Iterable[str] = (), session: Session) -> models.User:
+    query = select(models.User).options(*loader_options(load))
     if snowflake_only:
-        return session.scalar(select(models.User).where(models.User.snowflake == user))
-    return session.scalar(select(models.User).where(or_(models.User.id == user, models.User.snowflake == user)))
+        return session.scalar(query.where(models.User.snowflake == user))
+    return session.scalar(query.where(or_(models.User.id == user, models.User.snowflake == user)))
 
 
-def get_guild(guild: int, *, snowflake_only=True, session: Session) -> models.Guild:
+def get_guild(guild: int, *, snowflake_only=True, load: Iterable[str] = (), session: Session) -> models.Guild:
+    query = select(models.Guild).options(*loader_options(load))
     if snowflake_only:
-        return session.scalar(select(models.Guild).where(models.Guild.snowflake == guild))
-    return session.scalar(
-        select(models.Guild).where(or_(models.Guild.id == guild, models.Guild.snowflake == guild)))
+        return session.scalar(query.where(models.Guild.snowflake == guild))
+    return session.scalar(query.where(or_(models.Guild.id == guild, models.Guild.snowflake == guild)))
 
 
 def get_region(region: int | str, *, session: Session) -> models.Region:
     return session.scalar(select(models.Region).where(or_(models.Region.id == region, models.Region.name == region)))
 
 
-def get_nation(nation: int | str, *, session: Session) -> models.Nation:
-    return session.scalar(select(models.Nation).where(or_(models.Nation.id == nation, models.Nation.name == nation)))
+def get_nation(nation: int | str, *, load: Iterable[str] = (), session: Session) -> models.Nation:
+    return session.scalar(select(models.Nation)
+                          .where(or_(models.Nation.id == nation, models.Nation.name == nation))
+                          .options(*loader_options(load)))
+
+
+def get_users_by_snowflakes(snowflakes: Iterable[int], *, session: Session) -> dict[int, models.User]:
+    """
+    Gets the users with the given snowflakes, along with their nations and the regions those are in, keyed by
+    snowflake. Snowflakes without a user are left out.
+    """
+    users: dict[int, models.User] = {}
+    for chunk in _chunked(set(snowflakes)):
+        users.update((user.snowflake, user) for user in
+                     session.scalars(select(models.User)
+                                     .where(models.User.snowflake.in_(chunk))
+                                     .options(*loader_options(("user_nations",)))))
+    return users
+
+
+def get_nations_by_names(names: Iterable[str], *, session: Session) -> dict[str, models.Nation]:
+    """
+    Gets the nations with the given names, along with their region and users, keyed by name. Names without a nation
+    are left out.
+    """
+    nations: dict[str, models.Nation] = {}
+    for chunk in _chunked(set(names)):
+        nations.update((nation.name, nation) for nation in
+                       session.scalars(select(models.Nation)
+                                       .where(models.Nation.name.in_(chunk))
+                                       .options(*loader_options(("nation_region", "nation_users")))))
+    return nations
+
+
+def get_regions_by_names(names: Iterable[str], *, session: Session) -> dict[str, models.Region]:
+    """
+    Gets the regions with the given names, keyed by name. Names without a region are left out.
+    """
+    regions: dict[str, models.Region] = {}
+    for chunk in _chunked(set(names)):
+        regions.update((region.name, region) for region in
+                       session.scalars(select(models.Region).where(models.Region.name.in_(chunk))))
+    return regions
+
+
+def get_linked_regions(*, session: Session) -> Sequence[models.Region]:
+    """
+    Gets every region that is linked to at least one guild.
+    """
+    return session.scalars(select(models.Region).where(models.Region.guilds.any())).all()
+
+
+def get_nation_regions(*, session: Session) -> Sequence[Row[tuple[int, str, int]]]:
+    """
+    Gets the id, name, and region id of every nation without loading the nations themselves.
+    """
+    return session.execute(select(models.Nation.id, models.Nation.name, models.Nation.region_id)).all()
+
+
+def get_nation_user_snowflakes(nations: Iterable[int], *, session: Session) -> Sequence[int]:
+    """
+    Gets the snowflakes of every user that owns any of the given nations (by id).
+    """
+    snowflakes: set[int] = set()
+    for chunk in _chunked(set(nations)):
+        snowflakes.update(session.scalars(select(models.User.snowflake)
+                                          .join(models.User.nations)
+                                          .where(models.Nation.id.in_(chunk))))
+    return list(snowflakes)
+
+
+def get_user_region_ids(users: Optional[Iterable[int]] = None, *, session: Session) -> dict[int, set[int]]:
+    """
+    Gets the ids of the regions every user's nations are in, keyed by the user's snowflake. Users without any nations
+    are left out. If users (snowflakes) is given, only those users are looked up.
+    """
+    query = select(models.User.snowflake, models.Nation.region_id).join(models.User.nations)
+    queries = [query] if users is None else [query.where(models.User.snowflake.in_(chunk))
+                                             for chunk in _chunked(set(users))]
+
+    user_regions: dict[int, set[int]] = {}
+    for chunk_query in queries:
+        for snowflake, region_id in session.execute(chunk_query):
+            user_regions.setdefault(snowflake, set()).add(region_id)
+    return user_regions
+
+
+def update_nation_regions(nation_regions: Mapping[int, int], *, session: Session):
+    """
+    Moves every nation to a new region in one bulk update.
+
+    Args:
+        nation_regions: The new region id for each nation, keyed by nation id.
+        session: DB Session.
+    """
+    if nation_regions:
+        session.execute(update(models.Nation),
+                        [{"id": nation, "region_id": region} for nation, region in nation_regions.items()])
 
 
-def get_role(role: int, *, snowflake_only=False, session: Session) -> models.Role:
+def get_role(role: int, *, snowflake_only=False, load: Iterable[str] = (), session: Session) -> models.Role:
+    query = select(models.Role).options(*loader_options(load))
     if snowflake_only:
-        return session.scalar(select(models.Role).where(models.Role.snowflake == role))
-    return session.scalar(select(models.Role).where(or_(models.Role.id == role, models.Role.snowflake == role)))
+        return session.scalar(query.where(models.Role.snowflake == role))
+    return session.scalar(query.where(or_(models.Role.id == role, models.Role.snowflake == role)))
 
 
 def get_meaning(meaning: int | str, *, session: Session) -> models.Meaning:
@@ -220,18 +465,21 @@ def update_role(role: int | models.Role, new_snowflake: int, *, snowflake_only=F
 
 
 def get_guildrole_with_meaning(guild: int | models.Guild, meaning: int | str | models.Meaning,
-                               *, snowflake_only=True, session: Session) -> models.Role:
+                               *, snowflake_only=True, load: Iterable[str] = (), session: Session) -> models.Role:
     if not isinstance(guild, models.Guild):
         guild = get_guild(guild, snowflake_only=snowflake_only, session=session)
 
     if not isinstance(meaning, models.Meaning):
         meaning = get_meaning(meaning, session=session)
+    if guild is None or meaning is None:
+        return None
 
     query = (select(models.Role)
              .where(models.Role.guild == guild)
              .join(models.role_meaning)
              .join(models.Meaning)
-             .where(models.Meaning == cast(meaning, models.Meaning))
+             .where(models.Meaning.id == meaning.id)
+             .options(*loader_options(load))
              .distinct())
 
     return session.scalar(query)
@@ -0,0 +1,34 @@
+"""
+Keeps the database schema up to date with the Alembic migrations in `Scout/alembic`.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import Connection, inspect
+
+import Scout
+
+BASELINE = "0001"
+"""The revision matching the schema `Base.metadata.create_all` made before migrations were used."""
+
+SCRIPT_LOCATION = os.path.join(os.path.dirname(Scout.__file__), "alembic")
+
+
+def alembic_config(connection: Connection) -> Config:
+    """Creates the Alembic configuration to migrate the database over the given connection."""
+    config = Config()
+    config.set_main_option("script_location", SCRIPT_LOCATION)
+    config.attributes["connection"] = connection
+    return config
+
+
+def upgrade(connection: Connection, revision: str = "head"):
+    """
+    Upgrades the database to revision. Databases made before migrations were used are stamped with the baseline
+    revision first, as they already have its tables.
+    """
+    if MigrationContext.configure(connection).get_current_revision() is None and inspect(connection).has_table("users"):
+        command.stamp(alembic_config(connection), BASELINE)
+    command.upgrade(alembic_config(connection), revision)
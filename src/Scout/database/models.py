@@ -2,7 +2,7 @@
 
 import sqlalchemy.sql.functions
 from datetime import datetime
-from sqlalchemy import Table, Column, ForeignKey, Identity, Text
+from sqlalchemy import Table, Column, ForeignKey, Identity, Index, Text
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from Scout.database.base import Base
@@ -11,21 +11,21 @@ user_nation = Table(
     "user_nations",
     Base.metadata,
     Column("nation_id", ForeignKey("nations.id"), primary_key=True),
-    Column("user_id", ForeignKey("users.id"), primary_key=True)
+    Column("user_id", ForeignKey("users.id"), primary_key=True, index=True)
 )
 
 guild_region = Table(
     "guild_regions",
     Base.metadata,
     Column("region_id", ForeignKey("regions.id"), primary_key=True),
-    Column("guild_id", ForeignKey("guilds.id"), primary_key=True)
+    Column("guild_id", ForeignKey("guilds.id"), primary_key=True, index=True)
 )
 
 role_meaning = Table(
     "role_meanings",
     Base.metadata,
     Column("meaning_id", ForeignKey("meanings.id"), primary_key=True),
-    Column("role_id", ForeignKey("roles.id"), primary_key=True)
+    Column("role_id", ForeignKey("roles.id"), primary_key=True, index=True)
 )
 
 
@@ -98,9 +98,9 @@ class Role(Base):
     __tablename__ = "roles"
 
     id: Mapped[int] = mapped_column(Identity(increment=1), primary_key=True)
-    snowflake: Mapped[int]
+    snowflake: Mapped[int] = mapped_column(index=True)
 
-    guild_id: Mapped[int] = mapped_column(ForeignKey("guilds.id"))
+    guild_id: Mapped[int] = mapped_column(ForeignKey("guilds.id"), index=True)
 
     meanings: Mapped[set["Meaning"]] = relationship(secondary=role_meaning, back_populates="roles")
     guild: Mapped["Guild"] = relationship(back_populates="roles")
@@ -117,6 +117,7 @@ class Meaning(Base):
         roles: A set of roles associated with any given meaning.
     """
     __tablename__ = "meanings"
+    __table_args__ = (Index("ix_meanings_meaning", "meaning", mysql_length=255),)
 
     id: Mapped[int] = mapped_column(Identity(increment=1), primary_key=True)
     meaning: Mapped[str] = mapped_column(Text)
@@ -196,6 +197,7 @@ class UserLocale(Base):
         user: The user the settings are for.
     """
     __tablename__ = "user_locales"
+    __table_args__ = (Index("ix_user_locales_user_id_priority", "user_id", "priority"),)
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
     locale: Mapped[str] = mapped_column(primary_key=True)
@@ -214,6 +216,7 @@ class GuildLocale(Base):
         guild: The guild the settings are for.
     """
     __tablename__ = "guild_locale"
+    __table_args__ = (Index("ix_guild_locale_guild_id_priority", "guild_id", "priority"),)
 
     guild_id: Mapped[int] = mapped_column(ForeignKey("guilds.id"), primary_key=True)
     locale: Mapped[str] = mapped_column(primary_key=True)
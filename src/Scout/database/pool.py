@@ -0,0 +1,47 @@
+"""
+Connection pools that report how long checking out a connection takes.
+"""
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, PoolProxiedConnection
+
+from Scout.metrics import MetricsSink
+
+__all__ = ["TimedQueuePool", "TimedAsyncAdaptedQueuePool"]
+
+
+class _TimedPool:
+    """ Records checkout times to `metrics`.
+
+    Metrics:
+        db_pool_checkout_seconds: How long each checkout waited for a connection, including any pre-ping.
+        db_pool_checkout_timeouts: The amount of checkouts that gave up as the pool was exhausted.
+        db_pool_checked_out: The amount of connections currently checked out.
+    """
+    metrics: MetricsSink = MetricsSink()
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()  # type: ignore[misc]
+        except exc.TimeoutError:
+            self.metrics.increment("db_pool_checkout_timeouts")
+            raise
+        finally:
+            self.metrics.observe("db_pool_checkout_seconds", time.perf_counter() - start)
+            self.metrics.gauge("db_pool_checked_out", self.checkedout())  # type: ignore[attr-defined]
+
+    def recreate(self):
+        # Engine.dispose() replaces the pool with a recreated one, which should keep reporting to the same place.
+        pool = super().recreate()  # type: ignore[misc]
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
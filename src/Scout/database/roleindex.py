@@ -0,0 +1,94 @@
+"""
+An in-memory index of the roles and regions each guild has linked, so they can be looked up without the database.
+"""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import Scout.database.models as models
+
+__all__ = ["RoleIndex"]
+
+
+class RoleIndex:
+    """ Maps (guild, meaning) to a role and guilds to their linked regions, all by snowflake/id.
+
+    The index is loaded from the database once with `load`, and is then kept current by whatever changes the roles,
+    meanings or regions of a guild. Every lookup is a dict lookup.
+    """
+
+    def __init__(self):
+        self._roles: dict[int, dict[str, int]] = {}
+        self._role_keys: dict[int, set[tuple[int, str]]] = {}
+        self._regions: dict[int, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._role_keys)
+
+    def load(self, *, session: Session):
+        """Replaces the contents of the index with what is in the database."""
+        self._roles.clear()
+        self._role_keys.clear()
+        self._regions.clear()
+
+        for guild, meaning, role in session.execute(select(models.Guild.snowflake, models.Meaning.meaning,
+                                                           models.Role.snowflake)
+                                                    .join(models.Role.guild)
+                                                    .join(models.Role.meanings)):
+            self.add(guild, meaning, role)
+
+        for guild, region in session.execute(select(models.Guild.snowflake, models.guild_region.c.region_id)
+                                             .join(models.guild_region,
+                                                   models.Guild.id == models.guild_region.c.guild_id)):
+            self.link_region(guild, region)
+
+    def get(self, guild: int, meaning: str) -> Optional[int]:
+        """Returns the snowflake of the guild's role with the meaning, if it has one."""
+        return self._roles.get(guild, {}).get(meaning.casefold(), None)
+
+    def roles(self, guild: int) -> dict[str, int]:
+        """Returns the snowflake of each of the guild's roles, keyed by meaning. This must not be modified."""
+        return self._roles.get(guild, {})
+
+    def regions(self, guild: int) -> set[int]:
+        """Returns the ids of the regions linked to the guild. This must not be modified."""
+        return self._regions.get(guild, set())
+
+    def add(self, guild: int, meaning: str, role: int):
+        """Records role as the guild's role for meaning, replacing any role it had."""
+        meaning = meaning.casefold()
+        roles = self._roles.setdefault(guild, {})
+        if (previous := roles.get(meaning, None)) is not None:
+            previous_keys = self._role_keys[previous]
+            previous_keys.discard((guild, meaning))
+            if not previous_keys:
+                del self._role_keys[previous]
+        roles[meaning] = role
+        self._role_keys.setdefault(role, set()).add((guild, meaning))
+
+    def remove_role(self, role: int):
+        """Forgets a role for every meaning it had."""
+        for guild, meaning in self._role_keys.pop(role, set()):
+            del self._roles[guild][meaning]
+
+    def update_role(self, before: int, after: int):
+        """Moves every meaning of a role over to a new snowflake."""
+        keys = self._role_keys.pop(before, set())
+        if not keys:
+            return
+        for guild, meaning in keys:
+            self._roles[guild][meaning] = after
+        self._role_keys.setdefault(after, set()).update(keys)
+
+    def link_region(self, guild: int, region: int):
+        self._regions.setdefault(guild, set()).add(region)
+
+    def unlink_region(self, guild: int, region: int):
+        self._regions.get(guild, set()).discard(region)
+
+    def remove_guild(self, guild: int):
+        """Forgets every role and region of a guild."""
+        for role in self._roles.pop(guild, {}).values():
+            self._role_keys.pop(role, None)
+        self._regions.pop(guild, None)
@@ -3,8 +3,14 @@
 This module contains the two classes we use to glue together discord.py and `fluent.runtime` so we can translate
 responses and the like with Scout.
 """
+import hashlib
+import logging
+import os
 import pathlib
-from collections.abc import Sequence, MutableMapping, Callable, Mapping
+import pickle
+import tempfile
+from collections.abc import Sequence, MutableMapping, Callable, Mapping, Hashable
+from importlib import metadata
 from typing import Optional, Any, cast, Generator, Iterable, Self
 
 from discord import Locale
@@ -15,24 +21,118 @@ from fluent.runtime.types import FluentType
 from fluent.syntax import FluentParser
 from fluent.syntax.ast import Resource
 
+from Scout.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    _FLUENT_SYNTAX_VERSION = metadata.version("fluent.syntax")
+except metadata.PackageNotFoundError:
+    _FLUENT_SYNTAX_VERSION = "unknown"
+
+RESOURCE_IDS = ("commands.ftl", "responses.ftl")
+"""The translation files every locale of every personality is made of."""
+
+_MISSING = object()
+
+
+class ResourceCache:
+    """ A cache of parsed .ftl files, so they are only parsed again when they change.
+
+    Every resource is stored along with the SHA-256 of the file it was parsed from, and is only used if the file still
+    has the same hash. The cache is saved to disk with pickle, so it must only ever be pointed at a file Scout itself
+    wrote. A cache that can't be read, or was made with another version of fluent.syntax, is ignored.
+
+    Attributes:
+        path: Where the cache is saved, if anywhere.
+        hits: The amount of files that didn't need to be parsed.
+        misses: The amount of files that had to be parsed.
+    """
+    path: Optional[str]
+    hits: int
+    misses: int
+
+    def __init__(self, path: Optional[str | os.PathLike] = None):
+        self.path = os.fspath(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._parser = FluentParser()
+        self._entries: dict[str, tuple[str, Resource]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                syntax_version, entries = pickle.load(f)
+        except Exception:
+            # Anything from a truncated file to classes that no longer exist, either way it's rebuilt from scratch.
+            logger.warning("Discarding unreadable translation cache %s", self.path, exc_info=True)
+            return
+        if syntax_version == _FLUENT_SYNTAX_VERSION:
+            self._entries = entries
+
+    def parse(self, path: pathlib.Path) -> Resource:
+        """Returns the parsed resource for the file at path, only parsing it if it isn't cached or has changed."""
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        key = str(path.resolve())
+
+        entry = self._entries.get(key, None)
+        if entry is not None and entry[0] == digest:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        resource = self._parser.parse(data.decode('utf-8'))
+        self._entries[key] = (digest, resource)
+        self._dirty = True
+        return resource
+
+    def prune(self, paths: Iterable[pathlib.Path]):
+        """Drops every resource that isn't for one of the given files, such as those of files that were deleted."""
+        keep = {str(path.resolve()) for path in paths}
+        for key in self._entries.keys() - keep:
+            del self._entries[key]
+            self._dirty = True
+
+    def save(self):
+        """Writes the cache to disk if anything changed, replacing the old cache atomically."""
+        if self.path is None or not self._dirty:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as f:
+            pickle.dump((_FLUENT_SYNTAX_VERSION, self._entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, self.path)
+        self._dirty = False
+
 
 class ScoutResourceLoader(AbstractResourceLoader):
     """A Personality-Aware FluentResourceLoader Implementation"""
     base_path: str
     personality: str = ""
+    cache: ResourceCache
 
-    def __init__(self, base_path: str):
+    def __init__(self, base_path: str, cache: Optional[ResourceCache] = None):
         """
         Create a resource loader. The roots may be a string for a single
         location on disk, or a list of strings.
+
+        If a cache is given, files are only parsed again when they have changed.
         """
         self.base_path = base_path
+        self.cache = cache if cache is not None else ResourceCache()
 
     def supported_locales(self) -> Generator[str, None, None]:
         return (d.name for d in pathlib.Path(self.base_path
                                              .split("{locale}")[0][:-1]
                                              .format(personality=self.personality)
-                                             ).iterdir())
+                                             ).iterdir() if d.is_dir())
 
     def resources(self, locale: str, resource_ids: Sequence[str]) -> Sequence['Resource']:
         base_path = self.base_path.format(locale=locale, personality=self.personality)
@@ -42,47 +142,93 @@ class ScoutResourceLoader(AbstractResourceLoader):
             path = pathlib.Path(base_path).joinpath(resource_id)
             if not path.is_file():
                 continue
-            with open(path, 'r', encoding='utf-8') as f:
-                resources.append(FluentParser().parse(f.read()))
+            resources.append(self.cache.parse(path))
 
         if resources:
             return resources
 
 
 class PersonalityBundle:
-    """ A bundle implementation that supports personalities. """
+    """ A bundle implementation that supports personalities.
+
+    The bundle for a locale is only created the first time that locale is used. If `max_locales` is set, only that many
+    bundles are kept, and the least recently used one is dropped to make room for another (and created again if it is
+    used again).
+
+    Attributes:
+        personality: The personality the bundles are for.
+        max_locales: The most bundles to keep at once, or None to keep every bundle that was created.
+    """
     personality: str
-    _locales: MutableMapping[str, FluentBundle]
+    max_locales: Optional[int]
+    _available: frozenset[str]
+    _locales: LRUCache
 
     def __init__(self, personality: str, loader: ScoutResourceLoader, resource_ids: Sequence[str], bundle_class,
-                 *args, **kwargs):
+                 *args, max_locales: Optional[int] = None, **kwargs):
+        if max_locales is not None and max_locales < 1:
+            raise ValueError("max_locales must be at least 1, not {}".format(max_locales))
         self.personality = personality
-        self._locales = {}
-        self._create_bundles(loader, bundle_class, resource_ids, *args, **kwargs)
+        self.max_locales = max_locales
+        self._loader = loader
+        self._resource_ids = resource_ids
+        self._bundle_class = bundle_class
+        self._args = args
+        self._kwargs = kwargs
+        self._locales = LRUCache(max_locales)
+        loader.personality = personality
+        self._available = frozenset(loader.supported_locales())
 
     def supports(self, locale: str) -> bool:
-        return locale in self._locales.keys()
+        return locale in self._available
 
     def supported_locales(self) -> Iterable[str]:
+        return self._available
+
+    def loaded_locales(self) -> Iterable[str]:
+        """Returns the locales that currently have a bundle."""
         return self._locales.keys()
 
     def has_message(self, locale: str, msg_id: str):
-        return self._locales[locale].has_message(msg_id)
+        return self._bundle(locale).has_message(msg_id)
 
     def get_message(self, locale: str, msg_id: str):
-        return self._locales[locale].get_message(msg_id)
+        return self._bundle(locale).get_message(msg_id)
 
     def format_pattern(self, locale: str, *args, **kwargs):
-        return self._locales[locale].format_pattern(*args, **kwargs)
+        return self._bundle(locale).format_pattern(*args, **kwargs)
+
+    def _bundle(self, locale: str) -> FluentBundle:
+        bundle = self._locales.get(locale, None)
+        if bundle is not None:
+            return bundle
+
+        if locale not in self._available:
+            raise KeyError(locale)
+        bundle = self._create_bundle(locale)
+        self._locales.set(locale, bundle)
+        return bundle
 
-    def _create_bundles(self, loader: ScoutResourceLoader, bundle_class, resource_ids: Sequence[str], *args, **kwargs):
-        loader.personality = self.personality
-        for locale in loader.supported_locales():
-            resources = loader.resources(locale, resource_ids)
-            bundle = bundle_class([locale], *args, **kwargs)
-            for resource in resources:
-                bundle.add_resource(resource)
-            self._locales[locale] = bundle
+    def reloaded(self, locales: Iterable[str]) -> 'PersonalityBundle':
+        """ Returns a copy of this bundle, with the bundles of the given locales created again.
+
+        Bundles for other locales are reused, and locales that have been removed are dropped. Changed locales without a
+        bundle will just be created when they are first used.
+        """
+        locales = set(locales)
+        new = PersonalityBundle(self.personality, self._loader, self._resource_ids, self._bundle_class, *self._args,
+                                max_locales=self.max_locales, **self._kwargs)
+        for locale, bundle in self._locales.items():
+            if locale in new._available:
+                new._locales.set(locale, new._create_bundle(locale) if locale in locales else bundle)
+        return new
+
+    def _create_bundle(self, locale: str) -> FluentBundle:
+        self._loader.personality = self.personality
+        bundle = self._bundle_class([locale], *self._args, **self._kwargs)
+        for resource in self._loader.resources(locale, self._resource_ids) or []:
+            bundle.add_resource(resource)
+        return bundle
 
 
 class FluentScout:
@@ -95,6 +241,7 @@ class FluentScout:
     fallback_personality: str
     _allowed_personalities: Iterable[str]
     _personalities: MutableMapping[str, PersonalityBundle]
+    _resolved: dict[tuple[str, str, str], Optional[tuple[PersonalityBundle, str]]]
     resource_loader: ScoutResourceLoader
 
     def __init__(self,
@@ -104,21 +251,25 @@ class FluentScout:
                  fallback_personality: str = "scout", fallback_locale: Optional[str] = None,
                  bundle_class: type[FluentBundle] = FluentBundle,
                  functions: Optional[Mapping[str, Callable[[Any], FluentType]]] = None,
-                 use_isolating: bool = False
+                 use_isolating: bool = False,
+                 max_locales: Optional[int] = None
                  ):
         """ Initializes FluentScout with the additional options necessary for our operation.
 
         Args:
             fallback_locale: The locale to use if the default locale has no information
             fallback_personality: The personality to fall back to if the locale isn't supported.
+            max_locales: The most locales to keep a bundle for per personality, or None for no limit.
         """
         self.resource_loader = resource_loader
         self.use_isolating = use_isolating
         self.functions = functions
         self.bundle_class = bundle_class
         self.resource_ids = resource_ids
+        self.max_locales = max_locales
         self.fallback_locale = fallback_locale
         self._personalities = {}
+        self._resolved = {}
         self.fallback_personality = fallback_personality
         self._allowed_personalities = supported_personalities if supported_personalities is not None else ["scout"]
         self._setup_bundles()
@@ -141,75 +292,194 @@ class FluentScout:
             raise TranslationError(context=TranslationContext(location=TranslationContextLocation.other,
                                                               data="Translation is messed up."))
 
-        supported = self._personalities[personality].supports(locale)
-        supported = supported and self._personalities[personality].has_message(locale, msg_id)
-        if supported:
-            msg = self._personalities[personality].get_message(locale, msg_id)
-            val, _errors = self._personalities[personality].format_pattern(locale, msg.value, args)
-            return cast(str, val)
-
-        supported = self._personalities[self.fallback_personality].supports(locale)
-        supported = supported and self._personalities[self.fallback_personality].has_message(locale, msg_id)
-        if supported:
-            msg = self._personalities[self.fallback_personality].get_message(locale, msg_id)
-            val, _errors = self._personalities[self.fallback_personality].format_pattern(locale, msg.value, args)
-            return cast(str, val)
-
-        supported = self._personalities[personality].supports(self.fallback_locale)
-        supported = supported and self._personalities[personality].has_message(self.fallback_locale, msg_id)
-        if supported:
-            msg = self._personalities[personality].get_message(self.fallback_locale, msg_id)
-            val, _errors = self._personalities[personality].format_pattern(self.fallback_locale, msg.value, args)
-            return cast(str, val)
-
-        supported = self._personalities[self.fallback_personality].supports(self.fallback_locale)
-        supported = supported and self._personalities[self.fallback_personality].has_message(self.fallback_locale,
-                                                                                             msg_id)
-        if supported:
-            msg = self._personalities[self.fallback_personality].get_message(self.fallback_locale, msg_id)
-            val, _errors = self._personalities[self.fallback_personality].format_pattern(self.fallback_locale,
-                                                                                         msg.value, args)
-            return cast(str, val)
-
-        return None
+        resolved = self._resolve(personality, locale, msg_id)
+        if resolved is None:
+            return None
+        bundle, bundle_locale = resolved
+        msg = bundle.get_message(bundle_locale, msg_id)
+        val, _errors = bundle.format_pattern(bundle_locale, msg.value, args)
+        return cast(str, val)
+
+    def _resolve(self, personality: str, locale: str, msg_id: str) -> Optional[tuple[PersonalityBundle, str]]:
+        """
+        Finds the bundle and locale to use for a message, remembering the answer until the next reload. Only the
+        personality bundle is remembered, not the message, so locales it drops can still be freed.
+        """
+        key = (personality, locale, msg_id)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
+        resolved = None
+        for bundle, bundle_locale in ((self._personalities[personality], locale),
+                                      (self._personalities[self.fallback_personality], locale),
+                                      (self._personalities[personality], self.fallback_locale),
+                                      (self._personalities[self.fallback_personality], self.fallback_locale)):
+            if bundle.supports(bundle_locale) and bundle.has_message(bundle_locale, msg_id):
+                resolved = (bundle, bundle_locale)
+                break
+        self._resolved[key] = resolved
+        return resolved
+
+    def reload(self, supported_personalities: Sequence[str], changed: Iterable[tuple[str, str]]):
+        """ Reloads the given (personality, locale) pairs, and picks up any personalities that were added or removed.
+
+        Every new bundle is created before any are swapped in, so a translation never sees a half-reloaded state.
+
+        Args:
+            supported_personalities: Every personality there now is.
+            changed: The personality and locale of every file that changed.
+        """
+        changed_locales: dict[str, set[str]] = {}
+        for personality, locale in changed:
+            changed_locales.setdefault(personality, set()).add(locale)
+
+        personalities: dict[str, PersonalityBundle] = {}
+        for personality in supported_personalities:
+            if personality in self._personalities:
+                bundle = self._personalities[personality]
+                if personality in changed_locales:
+                    bundle = bundle.reloaded(changed_locales[personality])
+                personalities[personality] = bundle
+            else:
+                personalities[personality] = PersonalityBundle(personality,
+                                                               self.resource_loader,
+                                                               self.resource_ids,
+                                                               self.bundle_class,
+                                                               functions=self.functions,
+                                                               use_isolating=self.use_isolating,
+                                                               max_locales=self.max_locales)
+
+        self._allowed_personalities = supported_personalities
+        self._personalities = personalities
+        self.invalidate()
+
+    def invalidate(self):
+        """Forgets every resolved message, so the next lookups use whatever the bundles contain now."""
+        self._resolved.clear()
 
     def _setup_bundles(self):
+        self.invalidate()
         for personality in self._allowed_personalities:
             self._personalities[personality] = PersonalityBundle(personality,
                                                                  self.resource_loader,
                                                                  self.resource_ids,
                                                                  self.bundle_class,
                                                                  functions=self.functions,
-                                                                 use_isolating=self.use_isolating)
+                                                                 use_isolating=self.use_isolating,
+                                                                 max_locales=self.max_locales)
 
 
 class ScoutTranslator(Translator):
     """The discord.py Translator implementation for scout that bridges the rest of the functionality we need."""
     _localization: FluentScout
     _personality: str
+    _cache_file: Optional[str]
+    _max_locales: Optional[int]
+    _digests: dict[pathlib.Path, str]
+    rendered: LRUCache
 
-    def __init__(self, personality):
+    def __init__(self, personality, cache_file: Optional[str] = None, max_locales: Optional[int] = None,
+                 render_cache_size: int = 1024):
+        """
+        Arguments:
+            personality: The personality to use.
+            cache_file: Where to keep the parsed translation files between runs, if anywhere.
+            max_locales: The most locales to keep loaded per personality, or None to keep every locale that was used.
+            render_cache_size: The most formatted messages to keep.
+        """
         self._personality = personality
+        self._cache_file = cache_file
+        self._max_locales = max_locales
+        self._digests = {}
+        self.rendered = LRUCache(render_cache_size)
 
     async def load(self):
         """This will do the loading of the translation information.
 
         This is required by Translator for this to work.
         """
-        loader = ScoutResourceLoader("translations/{personality}/{locale}")
-        self._localization = FluentScout([d.name for d in pathlib.Path("translations").iterdir()],
-                                         ["commands.ftl", "responses.ftl"], loader,
-                                         fallback_locale='en-US')
+        cache = ResourceCache(self._cache_file)
+        loader = ScoutResourceLoader("translations/{personality}/{locale}", cache)
+        self._digests = self._scan()
+        self._localization = FluentScout(self._personalities(), RESOURCE_IDS, loader,
+                                         fallback_locale='en-US', max_locales=self._max_locales)
+        self._update_cache()
+        self.rendered.clear()
+
+    async def reload(self) -> set[str]:
+        """ Reloads any translation files that changed since they were last loaded.
+
+        Only the bundles for the personalities and locales whose files changed are created again, and only the changed
+        files are parsed again.
+
+        If the current or fallback personality no longer exists, or the files can't be read, nothing is reloaded and the
+        translations already loaded are kept.
+
+        Returns:
+            The paths of the files that changed, relative to the translations directory, such as
+            "scout/en-US/commands.ftl". If any file changed, the command tree may need to be synced again for Discord to
+            see the changes.
+        """
+        try:
+            digests = self._scan()
+            personalities = self._personalities()
+            missing = {self._personality, self._localization.fallback_personality} - set(personalities)
+            if missing:
+                raise KeyError(", ".join(sorted(missing)))
+
+            changed = {path for path in digests.keys() | self._digests.keys()
+                       if digests.get(path, None) != self._digests.get(path, None)}
+            if changed:
+                self._localization.reload(personalities, ((path.parts[-3], path.parts[-2]) for path in changed))
+        except KeyError as e:
+            logger.error("Not reloading translations, as the personality %s no longer exists", e.args[0])
+            return set()
+        except OSError:
+            logger.exception("Not reloading translations, as they could not be read")
+            return set()
+
+        self._digests = digests
+        self._update_cache()
+        if not changed:
+            return set()
+        self.rendered.clear()
+        return {path.relative_to("translations").as_posix() for path in changed}
+
+    def _update_cache(self):
+        """
+        Drops the resources of files that no longer exist from the resource cache and saves it, if it is saved anywhere.
+
+        Files are still only parsed when a bundle that uses them is created, and creating a bundle never writes to disk.
+        Whatever was parsed since the last save is written out here instead, on the next reload or when unloading.
+        """
+        cache = self._localization.resource_loader.cache
+        cache.prune(self._digests.keys())
+        cache.save()
+
+    @staticmethod
+    def _personalities() -> list[str]:
+        return [d.name for d in pathlib.Path("translations").iterdir() if d.is_dir()]
+
+    @staticmethod
+    def _scan() -> dict[pathlib.Path, str]:
+        """Returns the SHA-256 of every translation file, keyed by its path."""
+        return {path: hashlib.sha256(path.read_bytes()).hexdigest()
+                for resource_id in RESOURCE_IDS
+                for path in pathlib.Path("translations").glob("*/*/{}".format(resource_id))}
 
     async def unload(self):
         """This will unload any of the translation files that was loaded that needs to be unloaded by the class itself.
 
         This is required by Translator for this to work.
         """
-        pass
+        if hasattr(self, "_localization"):
+            self._localization.resource_loader.cache.save()
 
     def set_personality(self, personality: str) -> Self:
         self._personality = personality
+        self.rendered.clear()
         return self
 
     @staticmethod
@@ -235,8 +505,29 @@ class ScoutTranslator(Translator):
         if "…" in string.message:
             return "…"
         personality = personality if personality is not None else self._personality
-        return self._localization.format_value(string.message, locale=str(locale), personality=personality,
-                                               args=string.extras)
+        key = self._render_key(personality, str(locale), string.message, string.extras)
+        if key is not None and (message := self.rendered.get(key, _MISSING)) is not _MISSING:
+            return message
+
+        message = self._localization.format_value(string.message, locale=str(locale), personality=personality,
+                                                  args=string.extras)
+        if key is not None:
+            self.rendered.set(key, message)
+        return message
+
+    @staticmethod
+    def _render_key(personality: str, locale: str, msg_id: str,
+                    args: Optional[Mapping[str, Any]]) -> Optional[Hashable]:
+        """
+        Returns the key for a formatted message in `rendered`, or None if its arguments can't be hashed (in which case
+        it isn't cached).
+        """
+        key = (personality, locale, msg_id, tuple(sorted(args.items())) if args else ())
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
 
     async def translate_response(self, string: str, locale: Optional[Locale] = None, personality: Optional[str] = None,
                                  **kwargs) -> Optional[str]:
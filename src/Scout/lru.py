@@ -0,0 +1,79 @@
+"""
+A small least recently used cache, shared by the caches in Scout that need to be bounded.
+"""
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, KeysView, ItemsView
+from typing import Any, Optional
+
+__all__ = ["LRUCache"]
+
+_MISSING = object()
+
+
+class LRUCache:
+    """ A bounded in-memory cache. Once the cache is full the least recently used entry is dropped to make room.
+
+    Attributes:
+        maxsize: The maximum amount of entries to hold, or None for no limit.
+        hits: The amount of lookups that were answered from the cache.
+        misses: The amount of lookups that were not in the cache.
+        on_evict: Called with the key and value of every entry that is dropped to make room.
+    """
+    maxsize: Optional[int]
+    hits: int
+    misses: int
+    on_evict: Optional[Callable[[Hashable, Any], None]]
+
+    def __init__(self, maxsize: Optional[int] = 1024, on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.on_evict = on_evict
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def keys(self) -> KeysView[Hashable]:
+        """The keys of every entry, from least to most recently used."""
+        return self._entries.keys()
+
+    def items(self) -> ItemsView[Hashable, Any]:
+        """The key and value of every entry, from least to most recently used. This doesn't count as using them."""
+        return self._entries.items()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Returns the cached value for key, or default if it isn't cached."""
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Caches value under key, dropping the least recently used entries if the cache is over its size."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while self.maxsize is not None and len(self._entries) > self.maxsize:
+            evicted = self._entries.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(*evicted)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Removes key from the cache, returning whether anything was removed."""
+        return self._entries.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        """Removes everything from the cache. This does not reset the hit and miss counters."""
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
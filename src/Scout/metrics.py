@@ -0,0 +1,187 @@
+"""
+Metrics for Scout.
+
+Anything that wants to record metrics takes a `MetricsSink`, which by default is an `InMemoryMetrics`. Metrics recorded
+in memory can be exposed in the Prometheus text format with the `PrometheusExporter`.
+"""
+import bisect
+import math
+from collections.abc import Sequence
+from typing import Optional
+
+from aiohttp import web
+
+__all__ = ["MetricsSink", "InMemoryMetrics", "Histogram", "PrometheusExporter", "DEFAULT_BUCKETS"]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsSink:
+    """ The interface for recording metrics. This implementation discards everything recorded.
+
+    Subclass this to send metrics elsewhere.
+    """
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Adds value to the counter name."""
+        pass
+
+    def gauge(self, name: str, value: float, **labels):
+        """Sets the gauge name to value."""
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        """Records value, such as a duration, in the histogram name."""
+        pass
+
+
+class Histogram:
+    """ A cumulative histogram, as used by Prometheus.
+
+    Attributes:
+        buckets: The upper bound of each bucket.
+        counts: The amount of observations that fell into each bucket (not cumulative), plus one for everything above
+                the last bucket.
+        sum: The sum of every observation.
+        count: The amount of observations.
+    """
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    buckets: Sequence[float]
+    counts: list[int]
+    sum: float
+    count: int
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class InMemoryMetrics(MetricsSink):
+    """ A metrics sink that keeps everything in memory.
+
+    Attributes:
+        counters: Every counter, keyed by name and labels.
+        gauges: Every gauge, keyed by name and labels.
+        histograms: Every histogram, keyed by name and labels.
+    """
+    counters: dict[tuple[str, Labels], float]
+    gauges: dict[tuple[str, Labels], float]
+    histograms: dict[tuple[str, Labels], Histogram]
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._buckets = buckets
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels):
+        self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(self._buckets)
+        self.histograms[key].observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        """Returns the current value of a counter, or 0 if nothing has been recorded."""
+        return self.counters.get((name, _labels(labels)), 0)
+
+
+class PrometheusExporter:
+    """ Exposes an `InMemoryMetrics` in the Prometheus text format.
+
+    Attributes:
+        metrics: The metrics to expose.
+        prefix: The prefix to add to every metric name.
+    """
+    metrics: InMemoryMetrics
+    prefix: str
+
+    def __init__(self, metrics: InMemoryMetrics, prefix: str = "scout_"):
+        self.metrics = metrics
+        self.prefix = prefix
+        self._runner: Optional[web.AppRunner] = None
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+        labels = labels + extra
+        if not labels:
+            return ""
+        escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in labels)
+        return "{{{}}}".format(",".join('{}="{}"'.format(k, v) for (k, _), v in zip(labels, escaped)))
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(float(value))
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text format."""
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def add_type(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append("# TYPE {} {}".format(name, kind))
+
+        for (name, labels), value in sorted(self.metrics.counters.items()):
+            name = "{}{}".format(self.prefix, name)
+            add_type(name, "counter")
+            lines.append("{}{} {}".format(name, self._format_labels(labels), self._format_value(value)))
+
+        for (name, labels), value in sorted(self.metrics.gauges.items()):
+            name = "{}{}".format(self.prefix, name)
+            add_type(name, "gauge")
+            lines.append("{}{} {}".format(name, self._format_labels(labels), self._format_value(value)))
+
+        for (name, labels), histogram in sorted(self.metrics.histograms.items(), key=lambda item: item[0]):
+            name = "{}{}".format(self.prefix, name)
+            add_type(name, "histogram")
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(name,
+                                                     self._format_labels(labels, (("le", self._format_value(bound)),)),
+                                                     cumulative))
+            lines.append("{}_sum{} {}".format(name, self._format_labels(labels), self._format_value(histogram.sum)))
+            lines.append("{}_count{} {}".format(name, self._format_labels(labels), histogram.count))
+
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, _request: web.Request) -> web.Response:
+        """An aiohttp handler that responds with the rendered metrics."""
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self, host: str, port: int):
+        """Starts serving the metrics over HTTP at /metrics."""
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
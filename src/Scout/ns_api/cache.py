@@ -0,0 +1,117 @@
+"""
+Response caching for the NationStates API client.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Hashable
+from typing import Any, Optional
+
+from Scout.lru import LRUCache
+
+__all__ = ["TTLCache", "PersistentCache"]
+
+
+class TTLCache(LRUCache):
+    """ A bounded in-memory cache where every entry expires after a set amount of time.
+
+    Once the cache is full the least recently used entry is dropped to make room.
+
+    Attributes:
+        maxsize: The maximum amount of entries to hold.
+        ttl: How long, in seconds, an entry is valid for.
+        hits: The amount of lookups that were answered from the cache.
+        misses: The amount of lookups that were not in the cache or had expired.
+    """
+    ttl: float
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, timer: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self._timer = timer
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._timer()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Returns the cached value for key, or default if it isn't cached or has expired."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self._timer():
+            del self._entries[key]
+
+        entry = super().get(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Caches value under key, for ttl seconds if given or the cache's ttl otherwise."""
+        super().set(key, (self._timer() + (self.ttl if ttl is None else ttl), value))
+
+
+class PersistentCache:
+    """ An on-disk cache of API responses, stored in a SQLite database so it survives restarts.
+
+    Entries are keyed by the normalized request url and store when they expire, using the wall clock as the cache is
+    shared between runs. Values must be JSON serializable.
+
+    Attributes:
+        path: The path to the SQLite database.
+        ttl: How long, in seconds, an entry is valid for unless otherwise specified.
+        hits: The amount of lookups that were answered from the cache.
+        misses: The amount of lookups that were not in the cache or had expired.
+    """
+    path: str
+    ttl: float
+    hits: int
+    misses: int
+
+    def __init__(self, path: str | os.PathLike, ttl: float = 300):
+        self.path = os.fspath(path)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS responses "
+                                     "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+            self._connection.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM responses WHERE key = ? AND expires > ?",
+                                           (key, time.time())).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+                                     (key, json.dumps(value), expires))
+
+    def _invalidate(self, key: str):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for key, or None if it isn't cached or has expired."""
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Caches value under key, for ttl seconds if given or the cache's ttl otherwise."""
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def invalidate(self, key: str):
+        """Removes key from the cache."""
+        await asyncio.to_thread(self._invalidate, key)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
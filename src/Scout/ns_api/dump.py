@@ -0,0 +1,73 @@
+"""
+Reading of the NationStates daily data dumps.
+
+NationStates publishes every nation and region once a day at `nations.xml.gz` and `regions.xml.gz`. These are large, so
+they are decompressed and parsed as a stream, and each record is thrown away as soon as it has been read.
+"""
+import gzip
+import os
+from collections.abc import Iterable, Iterator
+from typing import IO
+from xml.etree.ElementTree import iterparse
+
+__all__ = ["NATIONS_DUMP_URL", "REGIONS_DUMP_URL", "iter_records", "iter_nations", "iter_regions"]
+
+NATIONS_DUMP_URL = "https://www.nationstates.net/pages/nations.xml.gz"
+REGIONS_DUMP_URL = "https://www.nationstates.net/pages/regions.xml.gz"
+
+
+def iter_records(dump: str | os.PathLike | IO[bytes], record: str,
+                 fields: Iterable[str]) -> Iterator[dict[str, str]]:
+    """ Iterates over every record in a gzipped data dump.
+
+    Args:
+        dump: The path to, or a binary file of, the gzipped dump.
+        record: The tag of each record, such as `NATION` or `REGION`.
+        fields: The (lowercase) fields of each record to read, only direct children of the record are read.
+
+    Returns:
+        An iterator of the requested fields found in each record, keyed by the lowercase field name.
+    """
+    fields = frozenset(f.casefold() for f in fields)
+    record = record.casefold()
+
+    with gzip.open(dump, 'rb') as file:
+        root = None
+        depth = 0
+        values: dict[str, str] = {}
+        for event, element in iterparse(file, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+
+            depth -= 1
+            tag = element.tag.casefold()
+            if depth == 2 and tag in fields:
+                values[tag] = element.text or ""
+            elif depth == 1 and tag == record:
+                yield values
+                values = {}
+                root.clear()
+
+
+def iter_nations(dump: str | os.PathLike | IO[bytes]) -> Iterator[tuple[str, str]]:
+    """
+    Iterates over the nations dump, giving the name and region of every nation.
+    """
+    for nation in iter_records(dump, "NATION", ("name", "region")):
+        if "name" in nation and "region" in nation:
+            yield nation["name"], nation["region"]
+
+
+def iter_regions(dump: str | os.PathLike | IO[bytes]) -> Iterator[tuple[str, str]]:
+    """
+    Iterates over the regions dump, giving the name and region of every nation in every region.
+    """
+    for region in iter_records(dump, "REGION", ("name", "nations")):
+        if "name" not in region:
+            continue
+        for nation in region.get("nations", "").split(":"):
+            if nation:
+                yield nation, region["name"]
@@ -1,22 +1,26 @@
 import asyncio
+import logging
+import time
+import urllib.parse
 from datetime import datetime
 from dataclasses import dataclass
-from typing import Optional, Self
+from collections.abc import Iterable
+from typing import Optional, Self, Any
 
 import aiohttp
 
 import Scout
+from Scout.metrics import MetricsSink, InMemoryMetrics
 from Scout.ns_api.region import Region
 from Scout.ns_api.nation import Nation
 from Scout.ns_api.exceptions import *
+from Scout.ns_api.ratelimit import Allowable, Priority, RateLimiter
+from Scout.ns_api.cache import TTLCache, PersistentCache
+from Scout.ns_api.parser import parse_response, convert_shards
 
-__all__ = ["NationStatesClient"]
+__all__ = ["NationStatesClient", "Priority"]
 
-
-@dataclass(frozen=True)
-class Allowable:
-    amount: int
-    seconds: int
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -32,6 +36,37 @@ class Requests:
     retry_after: Optional[int]
 
 
+def normalize_name(name: str) -> str:
+    """
+    Normalizes a nation or region name, so names from different parts of the API compare equal.
+    """
+    return name.replace(" ", "_").casefold()
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes an API url so requests for the same data compare equal, regardless of case or parameter order.
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = sorted((k.casefold(), v.casefold())
+                   for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    return urllib.parse.urlunsplit((parts.scheme.casefold(), parts.netloc.casefold(), parts.path,
+                                    urllib.parse.urlencode(query, safe="+"), ""))
+
+
+def request_kind(url: str) -> str:
+    """
+    Returns what kind of request a url is for, such as `nation`, `region`, or `verify`.
+    """
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+    if "a" in query:
+        return query["a"][0].casefold()
+    for kind in ("nation", "region"):
+        if kind in query:
+            return kind
+    return "other"
+
+
 def create_user_agent(contact_info: str, nation: str, region: Optional[str]):
     """
     Takes in the information and creates a user agent.
@@ -54,12 +89,24 @@ class NationStatesClient:
     verify_shard = 'a=verify&nation={}&checksum={}'
 
     requests: Requests
+    rate_limiter: RateLimiter
+    cache: TTLCache
+    persistent_cache: Optional[PersistentCache]
+    metrics: MetricsSink
+    _in_flight: dict[tuple[str, tuple[str, ...], bool], asyncio.Task]
     _allow_api_mismatch = False
 
-    def __init__(self, session: aiohttp.ClientSession, user_agent="ScoutBot-Suns_Reach"):
+    def __init__(self, session: aiohttp.ClientSession, user_agent="ScoutBot-Suns_Reach",
+                 *, cache_size: int = 1024, cache_ttl: float = 300,
+                 persistent_cache: Optional[PersistentCache] = None, metrics: Optional[MetricsSink] = None):
         self.user_agent = user_agent
         self.session = session
         self.requests = Requests(Allowable(0, 0), 0, 0, 0, 0, 0, 0)  # type: ignore
+        self.rate_limiter = RateLimiter()
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.persistent_cache = persistent_cache
+        self.metrics = metrics if metrics is not None else InMemoryMetrics()
+        self._in_flight = {}
         self.headers = {'User-Agent': self.user_agent}
 
     @staticmethod
@@ -68,30 +115,101 @@ class NationStatesClient:
             return "https://nationstates.net/page=verify_login"
         return "https://nationstates.net/page=verify_login?token={}".format(token)
 
-    async def get_region(self, region: str) -> Region:
-        url = "{}{}".format(self.base_url, self.region_shard.format(region.replace(" ", "_").casefold()))
+    @staticmethod
+    def _normalize_name(name: str) -> str:
+        return normalize_name(name)
+
+    async def invalidate_region(self, region: str):
+        """
+        Removes the region from the caches, so the next lookup goes to NationStates.
+        """
+        self.cache.invalidate(("region", self._normalize_name(region)))
+        if self.persistent_cache is not None:
+            await self.persistent_cache.invalidate(self._cache_key(*self._query_url(None, region, ("name",))))
+
+    async def invalidate_nation(self, nation: str):
+        """
+        Removes the nation from the caches, so the next lookup goes to NationStates.
+        """
+        self.cache.invalidate(("nation", self._normalize_name(nation)))
+        if self.persistent_cache is not None:
+            await self.persistent_cache.invalidate(self._cache_key(*self._query_url(nation, None, ("name", "region"))))
+
+    def _query_url(self, nation: Optional[str], region: Optional[str],
+                   shards: Iterable[str]) -> tuple[str, tuple[str, ...]]:
+        shards = tuple(sorted({s.casefold() for s in shards}))
+        if nation is not None:
+            url = "{}{}".format(self.base_url, self.nation_shard.format(self._normalize_name(nation)))
+        else:
+            url = "{}{}".format(self.base_url, self.region_shard.format(self._normalize_name(region)))
+        return "{}&q={}".format(url, "+".join(shards)), shards
+
+    async def query(self, *, nation: Optional[str] = None, region: Optional[str] = None,
+                    shards: Iterable[str], use_cache: bool = True,
+                    priority: Priority = Priority.NORMAL) -> dict[str, Any]:
+        """ Requests any number of shards for a single nation or region in one request.
+
+        Args:
+            nation: The nation to query, this can not be used with region.
+            region: The region to query, this can not be used with nation.
+            shards: The shards to request, such as `name`, `region`, or `nations`.
+            use_cache: Whether the persistent cache, if there is one, may answer the query.
+            priority: The priority to give the request if it has to go to NationStates.
+
+        Returns:
+            The value of each requested shard that NationStates returned, keyed by the lowercase shard name and
+            converted according to `Scout.ns_api.parser.SHARD_TYPES`.
+
+        Raises:
+            NationDoesNotExist: If the nation could not be found.
+            RegionDoesNotExist: If the region could not be found.
+        """
+        if (nation is None) == (region is None):
+            raise ValueError("Exactly one of nation or region must be provided!")
+
+        url, shards = self._query_url(nation, region, shards)
+        if not shards:
+            raise ValueError("At least one shard must be requested!")
+
+        response = await self._fetch(url, shards, use_cache=use_cache, priority=priority)
+        if not response and nation is not None:
+            raise NationDoesNotExist("Nation with name: {} does not exist!".format(nation))
+        elif not response:
+            raise RegionDoesNotExist("Region with name: {} does not exist!".format(region))
+        return convert_shards(response)
 
-        response = await self._make_request(url, self.headers)
+    async def get_region(self, region: str, *, use_cache: bool = True,
+                         priority: Priority = Priority.NORMAL) -> Region:
+        key = ("region", self._normalize_name(region))
+        if use_cache and (cached := self.cache.get(key)) is not None:
+            return cached
 
-        try:
-            name = response.split("<NAME>")[1].split("</NAME>")[0]
-        except KeyError:
-            raise RegionDoesNotExist("Region with name: {} does not exist!".format(region))
+        response = await self.query(region=region, shards=("name",), use_cache=use_cache, priority=priority)
 
-        return Region(name)
+        region = Region(response["name"])
+        self.cache.set(key, region)
+        return region
 
-    async def get_nation(self, nation: str) -> Nation:
-        url = '{}{}'.format(self.base_url, self.nation_shard.format(nation.replace(" ", "_").casefold()))
+    async def get_nation(self, nation: str, *, use_cache: bool = True,
+                         priority: Priority = Priority.NORMAL) -> Nation:
+        key = ("nation", self._normalize_name(nation))
+        if use_cache and (cached := self.cache.get(key)) is not None:
+            return cached
 
-        response = await self._make_request(url, self.headers)
-        try:
-            name = response.split("<NAME>")[1].split("</NAME>")[0]
-            region = response.split("<REGION>")[1].split("</REGION>")[0]
-        except KeyError:
+        response = await self.query(nation=nation, shards=("name", "region"), use_cache=use_cache,
+                                    priority=priority)
+        if "name" not in response or "region" not in response:
             raise NationDoesNotExist("Nation with name: {} does not exist!".format(nation))
-        return Nation(name, region)
 
-    async def verify(self, nation: Nation | str, code: str, token: Optional[str] = None) -> tuple[bool, Nation]:
+        nation = Nation(response["name"], response["region"])
+        self.cache.set(key, nation)
+        return nation
+
+    async def verify(self, nation: Nation | str, code: str, token: Optional[str] = None,
+                     *, priority: Priority = Priority.INTERACTIVE) -> tuple[bool, Nation]:
+        """
+        Checks a verification code with NationStates. This is never cached or shared with other requests.
+        """
         verify = '{}{}'.format(self.base_url, self.verify_shard)
         try:
             verify = verify.format(nation.name.replace(" ", "_").casefold(), code)  # type: ignore
@@ -103,65 +221,137 @@ class NationStatesClient:
         if token is not None:
             verify = '{}&token={}'.format(verify, token)
 
-        response = await self._make_request(verify, self.headers)
+        response = await self._make_request(verify, self.headers, ("name", "region", "verify"), priority=priority)
         try:
-            name = response.split("<NAME>")[1].split("</NAME>")[0]
-            region = response.split("<REGION>")[1].split("</REGION>")[0]
-            verified = response.split("<VERIFY>")[1].split("</VERIFY>")[0]
-        except KeyError as err:
+            nation = Nation(response["name"], response["region"])
+            verified = int(response["verify"])
+        except (KeyError, ValueError) as err:
             raise NationDoesNotExist("Nation with name: {} does not exist!".format(nation)) from err
-        nation = Nation(name, region)
-        return bool(int(verified)), nation
+        return bool(verified), nation
 
-    async def _make_request(self, url, headers) -> str:
-        if self.requests.remaining > 0 and self.requests.retry_after is None:
+    @staticmethod
+    def _cache_key(url: str, shards: tuple[str, ...]) -> str:
+        return "{} {}".format(normalize_url(url), "+".join(shards))
+
+    async def _fetch(self, url: str, shards: tuple[str, ...], *, use_cache: bool = True,
+                     priority: Priority = Priority.NORMAL) -> dict[str, str]:
+        """
+        Makes a request, sharing the response with any identical request that is already in flight.
+
+        Callers sharing a request get the priority of whoever made it first. Only requests with the same `use_cache` are
+        shared, so a caller that asked for fresh data never gets a cached response. This must not be used for anything
+        with side effects or one-time results, such as verification.
+        """
+        key = (normalize_url(url), shards, use_cache)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._cached_request(url, shards, use_cache=use_cache, priority=priority))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so one caller being cancelled doesn't cancel the request for everyone else waiting on it.
+        return await asyncio.shield(task)
+
+    async def _cached_request(self, url: str, shards: tuple[str, ...], *, use_cache: bool = True,
+                              priority: Priority = Priority.NORMAL) -> dict[str, str]:
+        """
+        Makes a request, going through the persistent cache if there is one.
+        """
+        if self.persistent_cache is None:
+            return await self._make_request(url, self.headers, shards, priority=priority)
+
+        key = self._cache_key(url, shards)
+        if use_cache and (cached := await self.persistent_cache.get(key)) is not None:
+            return cached
+
+        response = await self._make_request(url, self.headers, shards, priority=priority)
+        if response:
+            await self.persistent_cache.set(key, response)
+        return response
+
+    async def _make_request(self, url, headers, shards: tuple[str, ...],
+                            *, priority: Priority = Priority.NORMAL) -> dict[str, str]:
+        kind = request_kind(url)
+        for shard in shards:
+            self.metrics.increment("ns_shards_requested_total", kind=kind, shard=shard)
+
+        while True:
+            waited = await self.rate_limiter.acquire(priority)
+            self.metrics.observe("ns_ratelimit_wait_seconds", waited, priority=priority.name.casefold())
+
+            start = time.monotonic()
             async with self.session.get(url, headers=headers) as response:
                 self.update_requests(response.headers)
+                self.metrics.increment("ns_requests_total", kind=kind, status=response.status)
                 if response.status != 429:
-                    return await response.text()
-                return await self._make_request(url, headers)
-        else:
-            if self.requests.retry_after is not None:
-                await asyncio.sleep(self.requests.retry_after)
-                self.requests.retry_after = None
-                return await self._make_request(url, headers)
-
-            sleep_time = datetime.utcnow() - self.requests.last_request
-            await asyncio.sleep(sleep_time)  # type: ignore
-            self.requests.remaining = self.requests.limit
-            self.requests.request_count = 0
-            return await self._make_request(url, headers)
+                    result = await parse_response(response, shards)
+                    self.metrics.observe("ns_request_seconds", time.monotonic() - start, kind=kind)
+                    return result
+                self.metrics.increment("ns_rate_limited_total", kind=kind)
 
     async def build(self) -> Self:
         await self._check_version()
         return self
 
     def update_requests(self, headers):
-        amount, seconds = headers["RateLimit-Policy"].split(";")
-        limit = int(headers["RateLimit-Limit"])
-        remaining = int(headers["RateLimit-Remaining"])
-        reset = int(headers["RateLimit-Reset"])
-        try:
-            retry_after = int(headers['Retry-After'])
-        except KeyError:
-            retry_after = None
-
-        seconds = int(seconds.split("=")[1])
-        amount = int(amount)
+        """
+        Records the rate limit information from the response headers and hands it to the rate limiter.
+        """
+        def opt_int(name: str) -> Optional[int]:
+            try:
+                return int(headers[name])
+            except (KeyError, ValueError):
+                return None
 
-        self.requests = Requests(Allowable(amount, seconds), limit, remaining, reset, datetime.utcnow(),
-                                 self.requests.request_count + 1, retry_after)
-
-    async def _check_version(self):
-        async with self.session.get('{}{}'.format(self.base_url, self.version_shard), headers=self.headers) as response:
+        try:
+            amount, seconds = headers["RateLimit-Policy"].split(";")
+            allowable = Allowable(int(amount), int(seconds.split("=")[1]))
+        except (KeyError, IndexError, ValueError):
+            allowable = self.requests.allowable
+
+        limit = opt_int("RateLimit-Limit")
+        remaining = opt_int("RateLimit-Remaining")
+        reset = opt_int("RateLimit-Reset")
+        retry_after = opt_int("Retry-After")
+
+        self.rate_limiter.update(allowable, remaining, reset, retry_after)
+        if remaining is not None:
+            self.metrics.gauge("ns_ratelimit_remaining", remaining)
+        if retry_after is not None:
+            self.metrics.increment("ns_retry_after_total")
+            self.metrics.observe("ns_retry_after_seconds", retry_after)
+        self.requests = Requests(allowable,
+                                 limit if limit is not None else self.requests.limit,
+                                 remaining if remaining is not None else self.requests.remaining,
+                                 reset if reset is not None else self.requests.resets,
+                                 datetime.utcnow(), self.requests.request_count + 1, retry_after)
+
+    async def _get_version(self) -> int:
+        """
+        Gets the current API version. This is only kept in the in-memory cache, so a restart always sees the version
+        NationStates is on now.
+        """
+        key = ("version",)
+        if (cached := self.cache.get(key)) is not None:
+            return cached
+
+        url = '{}{}'.format(self.base_url, self.version_shard)
+
+        waited = await self.rate_limiter.acquire(Priority.INTERACTIVE)
+        self.metrics.observe("ns_ratelimit_wait_seconds", waited, priority=Priority.INTERACTIVE.name.casefold())
+        async with self.session.get(url, headers=self.headers) as response:
+            self.update_requests(response.headers)
+            self.metrics.increment("ns_requests_total", kind="version", status=response.status)
             version = int(await response.text())
 
-            if version != self.api_version and not self._allow_api_mismatch:
-                raise Exception(
-                    ("NationStates API Version: {} is not equal to expected version {}!"
-                     "Please Update the NS Client!").format(version, self.api_version))
-            elif version != self.api_version:
-                # TODO: Log here
-                pass
+        self.cache.set(key, version)
+        return version
 
-            self.update_requests(response.headers)
+    async def _check_version(self):
+        version = await self._get_version()
+        if version != self.api_version and not self._allow_api_mismatch:
+            raise Exception(
+                ("NationStates API Version: {} is not equal to expected version {}!"
+                 "Please Update the NS Client!").format(version, self.api_version))
+        elif version != self.api_version:
+            logger.warning("NationStates API Version: %s is not equal to expected version %s!",
+                           version, self.api_version)
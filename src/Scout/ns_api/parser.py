@@ -0,0 +1,134 @@
+"""
+Parsing for NationStates API responses.
+
+Responses are parsed incrementally as they are read off the connection, and only the requested shards are kept. This
+means large responses (such as a region's list of nations) are parsed in a single pass without holding onto the
+whole document.
+"""
+from collections.abc import Iterable, Callable
+from typing import Optional, Any
+from xml.etree.ElementTree import XMLPullParser, ParseError, Element
+
+import aiohttp
+
+__all__ = ["ShardParser", "parse_response", "convert_shards", "SHARD_TYPES"]
+
+CHUNK_SIZE = 16 * 1024
+
+
+def _name_list(separator: str) -> Callable[[str], tuple[str, ...]]:
+    def convert(value: str) -> tuple[str, ...]:
+        return tuple(v for v in value.split(separator) if v)
+    return convert
+
+
+SHARD_TYPES: dict[str, Callable[[str], Any]] = {
+    "nations": _name_list(":"),
+    "endorsements": _name_list(","),
+    "unnations": _name_list(","),
+    "numnations": int,
+    "numunnations": int,
+    "population": int,
+    "firstlogin": int,
+    "lastlogin": int,
+    "foundedtime": int,
+    "lastupdate": int,
+    "lastmajorupdate": int,
+    "lastminorupdate": int,
+    "tgcanrecruit": lambda value: value == "1",
+    "tgcancampaign": lambda value: value == "1",
+    "verify": lambda value: value == "1",
+}
+"""How to convert the text of a shard into a python value. Shards not listed here are left as strings."""
+
+
+class ShardParser:
+    """ An incremental parser that pulls the requested shards out of an API response.
+
+    Only shards that are direct children of the document's root element are looked at, which is where NationStates
+    puts them. Each shard is discarded from the tree as soon as it has been read.
+
+    Attributes:
+        shards: The (lowercase) names of the shards to collect.
+        values: The text of each shard that has been found so far, keyed by shard name.
+        failed: Whether the response turned out not to be valid XML.
+    """
+    __slots__ = ("shards", "values", "failed", "_parser", "_root", "_depth")
+
+    shards: frozenset[str]
+    values: dict[str, str]
+    failed: bool
+
+    def __init__(self, shards: Iterable[str]):
+        self.shards = frozenset(s.casefold() for s in shards)
+        self.values = {}
+        self.failed = False
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root: Optional[Element] = None
+        self._depth = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether every requested shard has been found."""
+        return len(self.values) == len(self.shards)
+
+    def feed(self, data: bytes):
+        """Feeds the next part of the response to the parser."""
+        if self.failed:
+            return
+
+        try:
+            self._parser.feed(data)
+            self._read_events()
+        except ParseError:
+            self.failed = True
+
+    def close(self) -> dict[str, str]:
+        """Finishes parsing and returns the shards that were found."""
+        if not self.failed:
+            try:
+                self._parser.close()
+                self._read_events()
+            except ParseError:
+                self.failed = True
+        return self.values
+
+    def _read_events(self):
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                self._depth += 1
+                continue
+
+            self._depth -= 1
+            if self._depth != 1:
+                continue
+
+            shard = element.tag.casefold()
+            if shard in self.shards and shard not in self.values:
+                self.values[shard] = element.text or ""
+            # Every child of the root is a complete shard at this point, so none of them are needed anymore.
+            self._root.clear()
+
+
+def convert_shards(values: dict[str, str]) -> dict[str, Any]:
+    """Converts the text of each shard into its python type according to `SHARD_TYPES`."""
+    return {shard: SHARD_TYPES.get(shard, str)(value) for shard, value in values.items()}
+
+
+async def parse_response(response: aiohttp.ClientResponse, shards: Iterable[str]) -> dict[str, str]:
+    """ Reads and parses the body of a response as it streams in.
+
+    Args:
+        response: The response to read the body of.
+        shards: The shards to pull out of the response.
+
+    Returns:
+        The text of each shard found, keyed by the lowercase shard name. If the response isn't valid XML, such as when
+        a nation or region doesn't exist, whatever was found before the error is returned.
+    """
+    parser = ShardParser(shards)
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        parser.feed(chunk)
+    return parser.close()
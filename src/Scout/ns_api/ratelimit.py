@@ -0,0 +1,201 @@
+"""
+Rate limiting for the NationStates API.
+
+NationStates enforces a sliding window (by default 50 requests every 30 seconds) per IP address. Going over it results
+in a 429 and a lockout, so every request the client makes must first go through the limiter here.
+"""
+import asyncio
+import bisect
+import enum
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+__all__ = ["Allowable", "Priority", "RateLimiter"]
+
+
+@dataclass(frozen=True)
+class Allowable:
+    amount: int
+    seconds: int
+
+
+class Priority(enum.IntEnum):
+    """ The lanes requests wait in. Lower values are served first.
+
+    INTERACTIVE is for anything a user is waiting on, such as verification. BACKGROUND is for bulk jobs, which only use
+    the capacity the other lanes leave over.
+    """
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+class RateLimiter:
+    """ An async sliding-window scheduler shared by every coroutine using the same client.
+
+    Each request that is let through is recorded with the (monotonic) time it was sent, and once `allowable.amount`
+    requests have been sent within `allowable.seconds` further requests wait until the oldest one leaves the window.
+
+    Waiting requests are queued by `Priority`, and a single dispatcher hands out capacity to the highest priority lane
+    first, in the order requests arrived within a lane. Background requests additionally leave `background_reserve`
+    of the window free for the other lanes. So lower lanes still make progress, a request that has waited longer than
+    `max_wait` is promoted by one lane (and a promoted background request no longer leaves the reserve free). Aged
+    requests compete with the lane they were promoted to by arrival time, so interactive requests are never queued
+    behind background ones.
+
+    The window is corrected from the `RateLimit-*` and `Retry-After` headers NationStates sends back, which also
+    accounts for requests made by anything else sharing our IP.
+
+    Attributes:
+        allowable: The amount of requests allowed within the window and the length of the window in seconds.
+        max_wait: How long, in seconds, a request can wait before it is promoted to the next higher priority lane.
+        background_reserve: The fraction of the window background requests can not use.
+    """
+    allowable: Allowable
+    max_wait: float
+    background_reserve: float
+
+    def __init__(self, amount: int = 50, seconds: int = 30, *, max_wait: float = 10, background_reserve: float = 0.2):
+        self.allowable = Allowable(amount, seconds)
+        self.max_wait = max_wait
+        self.background_reserve = background_reserve
+        self._sent: deque[float] = deque()
+        self._blocked_until = 0.0
+        self._lanes: dict[Priority, deque[tuple[float, asyncio.Future]]] = {p: deque() for p in Priority}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def remaining(self) -> int:
+        """The amount of requests that can be sent right now without waiting."""
+        now = time.monotonic()
+        if self._blocked_until > now:
+            return 0
+        self._prune(now)
+        return max(self.allowable.amount - len(self._sent), 0)
+
+    def delay(self, now: Optional[float] = None, reserve: int = 0) -> float:
+        """Returns how long, in seconds, the next request has to wait before it can be sent.
+
+        Args:
+            now: The current monotonic time.
+            reserve: The amount of the window to keep free.
+        """
+        now = time.monotonic() if now is None else now
+        self._prune(now)
+
+        delay = self._blocked_until - now
+        allowed = max(self.allowable.amount - reserve, 1)
+        if len(self._sent) >= allowed:
+            delay = max(delay, self._sent[len(self._sent) - allowed] + self.allowable.seconds - now)
+        return max(delay, 0.0)
+
+    @property
+    def waiting(self) -> dict[Priority, int]:
+        """The amount of requests waiting in each lane."""
+        return {priority: sum(not f.done() for _, f in lane) for priority, lane in self._lanes.items()}
+
+    async def acquire(self, priority: Priority = Priority.NORMAL) -> float:
+        """Waits until a request may be sent and records it against the window.
+
+        Args:
+            priority: The lane to wait in.
+
+        Returns:
+            The amount of time, in seconds, spent waiting.
+        """
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].append((start, future))
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        self._wakeup.set()
+
+        await future
+        return time.monotonic() - start
+
+    def _next_lane(self, now: float) -> tuple[Optional[deque[tuple[float, asyncio.Future]]], int, float]:
+        """
+        Picks the lane to serve next, along with how much of the window it has to leave free and how long until that
+        stops being the case.
+        """
+        for lane in self._lanes.values():
+            while lane and lane[0][1].done():
+                lane.popleft()
+
+        def rank(priority: Priority, lane: deque[tuple[float, asyncio.Future]]) -> tuple[int, float]:
+            aged = now - lane[0][0] >= self.max_wait
+            return max(priority - 1, Priority.INTERACTIVE) if aged else priority, lane[0][0]
+
+        waiting = [(rank(priority, lane), priority, lane) for priority, lane in self._lanes.items() if lane]
+        if not waiting:
+            return None, 0, 0
+
+        (effective, arrived), priority, lane = min(waiting, key=lambda entry: entry[0])
+        if priority == Priority.BACKGROUND and effective == priority:
+            reserve = int(self.allowable.amount * self.background_reserve)
+            return lane, reserve, self.max_wait - (now - arrived)
+        return lane, 0, 0
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            lane, reserve, starves_in = self._next_lane(now)
+            if lane is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self.delay(now, reserve)
+            if reserve:
+                delay = min(delay, starves_in)
+            if delay > 0:
+                # Wake up early if something new comes in, as it may need to go first.
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, future = lane.popleft()
+            self._sent.append(now)
+            future.set_result(None)
+
+    def update(self, allowable: Allowable, remaining: Optional[int], reset: Optional[int],
+               retry_after: Optional[int]):
+        """Reconciles the window with the rate limit information NationStates sent back.
+
+        Args:
+            allowable: The policy from the `RateLimit-Policy` header.
+            remaining: The value of the `RateLimit-Remaining` header.
+            reset: The value of the `RateLimit-Reset` header, the seconds until the window is clear.
+            retry_after: The value of the `Retry-After` header, if one was sent.
+        """
+        now = time.monotonic()
+        if allowable.amount > 0 and allowable.seconds > 0:
+            self.allowable = allowable
+        self._prune(now)
+
+        if retry_after is not None:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+        if remaining is None or reset is None:
+            return
+
+        if remaining <= 0:
+            self._blocked_until = max(self._blocked_until, now + reset)
+
+        # NationStates has seen requests we haven't, so count them as well. At the latest they leave the window when
+        # it resets.
+        unknown = (self.allowable.amount - remaining) - len(self._sent)
+        expires = now + reset - self.allowable.seconds
+        for _ in range(max(unknown, 0)):
+            bisect.insort(self._sent, expires)
+
+    def _prune(self, now: float):
+        while self._sent and self._sent[0] + self.allowable.seconds <= now:
+            self._sent.popleft()
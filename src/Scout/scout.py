@@ -3,21 +3,26 @@ The main module for Scout.
 
 This contains all the main 'logic' for the Discord Bot part of things.
 """
-
+import json
+import logging
 from typing import Optional, Any
 
 import aiohttp
 import discord
-from discord.ext import commands
-from sqlalchemy import Engine
+from discord.ext import commands, tasks
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import Session
 
 import Scout
 from Scout import config
-from Scout.database import db
-from Scout.database.base import Base
+from Scout.database import db, aiodb, models, migrations
+from Scout.database.exceptions import NotFound
+from Scout.database.roleindex import RoleIndex
 from Scout.exceptions import *
 from Scout.localization import ScoutTranslator
+from Scout.metrics import InMemoryMetrics, PrometheusExporter
+
+logger = logging.getLogger(__name__)
 
 intents = discord.Intents.default()
 
@@ -31,69 +36,191 @@ class ScoutBot(commands.Bot):
     The main Discord Bot Class
     """
     config: dict[str, Any]
-    engine: Engine
+    engine: AsyncEngine
+    session_maker: async_sessionmaker[AsyncSession]
     reusable_session: aiohttp.ClientSession
     meanings = {}
+    role_index: RoleIndex
     translator: ScoutTranslator
+    metrics: InMemoryMetrics
+    metrics_exporter: Optional[PrometheusExporter] = None
+    translation_watcher: Optional[tasks.Loop] = None
+    synced_commands: Optional[str] = None
 
     async def on_ready(self):
+        if self.config.get("METRICS_PORT", None) and self.metrics_exporter is None:
+            self.metrics_exporter = PrometheusExporter(self.metrics)
+            await self.metrics_exporter.start(self.config.get("METRICS_HOST", "127.0.0.1"), self.config["METRICS_PORT"])
+
         self.reusable_session = aiohttp.ClientSession()
-        self.engine = db.db_connect(dialect=self.config["DB_DIALECT"],
-                                    driver=self.config.get("DB_DRIVER", None),
-                                    table=self.config.get("DB_TABLE", None),
-                                    login=self.config.get("DB_LOGIN", {'user': None, 'password': None}),
-                                    connect=self.config.get("DB_CONN", {'host': None, 'port': None}))
+        self.engine = db.db_connect_async(dialect=self.config["DB_DIALECT"],
+                                          driver=self.config.get("DB_ASYNC_DRIVER", None),
+                                          table=self.config.get("DB_TABLE", None),
+                                          login=self.config.get("DB_LOGIN", {'user': None, 'password': None}),
+                                          connect=self.config.get("DB_CONN", {'host': None, 'port': None}),
+                                          pool=self.config.get("DB_POOL", None),
+                                          statement_timeout=self.config.get("DB_STATEMENT_TIMEOUT", None),
+                                          metrics=self.metrics)
+        self.session_maker = aiodb.sessionmaker(self.engine)
         print("We are logged in as {}".format(self.user))
-        Base.metadata.create_all(self.engine)
-        self.translator = ScoutTranslator("scout")
+        async with self.engine.begin() as connection:
+            await connection.run_sync(migrations.upgrade)
+        async with self.session_maker() as session:
+            await aiodb.run_sync(self.role_index.load, session=session)
+        self.translator = ScoutTranslator("scout", cache_file=self.config.get("TRANSLATIONS_CACHE_FILE", None),
+                                          max_locales=self.config.get("TRANSLATIONS_MAX_LOCALES", None))
         await self.load_extension("Scout.core.nationstates.nsverify")
         await self.load_extension("Scout.core.translations.translations")
         await self.tree.set_translator(self.translator)
         await self.tree.sync()
-
-    def register_meaning(self, meaning: str, *, suppress_error=False, session: Optional[Session] = None):
-        if session is None:
-            with Session(self.engine) as session:
-                return self.register_meaning(meaning, suppress_error=suppress_error, session=session)
-
+        self.synced_commands = await self.command_payload()
+
+        if self.config.get("TRANSLATIONS_WATCH_SECONDS", None) and self.translation_watcher is None:
+            self.translation_watcher = tasks.loop(seconds=self.config["TRANSLATIONS_WATCH_SECONDS"])(
+                self.reload_translations)
+            self.translation_watcher.start()
+
+    async def command_payload(self) -> str:
+        """Returns the translated global commands, as they are sent to Discord when the command tree is synced."""
+        return json.dumps([await command.get_translated_payload(self.translator)
+                           for command in self.tree.get_commands()], sort_keys=True)
+
+    async def reload_translations(self) -> set[str]:
+        """ Reloads any translation files that changed.
+
+        Whenever any file changed, the commands Discord would be sent are worked out again, as command strings can come
+        from any file. The command tree is only synced if they actually differ from the last sync, so changes to strings
+        that aren't used by any command don't use up any of Discord's sync rate limit. If a sync
+        fails it is tried again on the next reload.
+
+        Returns:
+            The paths of the translation files that changed, relative to the translations directory.
+        """
+        changed = await self.translator.reload()
+        if changed:
+            logger.info("Reloaded translations: %s", ", ".join(sorted(changed)))
+
+        if changed or self.synced_commands is None:
+            payload = await self.command_payload()
+            if payload != self.synced_commands:
+                try:
+                    await self.tree.sync()
+                except discord.HTTPException:
+                    logger.exception("Could not sync the command tree after reloading translations")
+                    self.synced_commands = None
+                else:
+                    self.synced_commands = payload
+        return changed
+
+    def register_meaning(self, meaning: str, *, suppress_error=False, session: Session):
         if meaning in self.meanings and not suppress_error:
             raise MeaningRegistered(meaning)
 
         meaning_db = db.register_role_meaning(meaning, session=session)
+        session.flush()
         self.meanings[meaning] = meaning_db.id
 
-    async def register_meaning_async(self, meaning: str, *, suppress_error=False, session: Optional[Session] = None):
-        self.register_meaning(meaning, suppress_error=suppress_error, session=session)
+    async def register_meaning_async(self, meaning: str, *, suppress_error=False,
+                                     session: Optional[AsyncSession] = None):
+        if session is None:
+            async with self.session_maker() as session:
+                await self.register_meaning_async(meaning, suppress_error=suppress_error, session=session)
+                await session.commit()
+                return
+
+        await aiodb.run_sync(self.register_meaning, meaning, suppress_error=suppress_error, session=session)
+
+    @staticmethod
+    def add_role(role: discord.Role, guild: Optional[models.Guild], meaning: str, *, override=False,
+                 session: Session) -> models.Role:
+        """Links a role to a meaning in a guild. The role index is not updated, as the session may not be committed.
+
+        Arguments:
+            role: The role to link.
+            guild: The guild the role is in.
+            meaning: The meaning to give the role.
+            override: Whether to replace the role the guild already has for the meaning.
+            session: DB Session.
+
+        Raises:
+            InvalidGuild: If the guild is not in the database.
+            InvalidMeaning: If the meaning has not been registered.
+            RoleOverwrite: If the guild already has a different role for the meaning, and override is not set.
+        """
+        if guild is None:
+            raise InvalidGuild()
+
+        meaning_db = db.get_meaning(meaning.casefold(), session=session)
+        if meaning_db is None:
+            raise InvalidMeaning(meaning)
+
+        current = db.get_guildrole_with_meaning(guild, meaning_db, load=("role_meanings",), session=session)
+        if current is not None and current.snowflake != role.id:
+            if not override:
+                raise RoleOverwrite()
+            current.meanings.discard(meaning_db)
+            meaning_db.roles.discard(current)
+            if not current.meanings:
+                db.remove_role(current, session=session)
+
+        role_db = db.get_role(role.id, snowflake_only=True, load=("role_meanings",), session=session)
+        if role_db is None:
+            role_db = db.register_role(role.id, guild=guild, session=session)
+        db.link_role_meaning(role_db, meaning_db, session=session)
+        return role_db
+
+    async def remove_role(self, role: discord.Role) -> Optional[discord.Role]:
+        """Forgets a role and all of its meanings, returning the role if it was known."""
+        async with self.session_maker() as session:
+            try:
+                await aiodb.remove_role(role.id, snowflake_only=True, session=session)
+            except NotFound:
+                return None
+            await session.commit()
+        self.role_index.remove_role(role.id)
+        return role
 
     async def close(self, *args, **kwargs):
+        if self.translation_watcher is not None:
+            self.translation_watcher.cancel()
+        await self.translator.unload()
         await super().close(*args, **kwargs)
         await self.reusable_session.close()
+        if self.metrics_exporter is not None:
+            await self.metrics_exporter.stop()
 
 
 _config = config.load_configuration()
 scout = ScoutBot(command_prefix=_config["PREFIXES"], intents=intents)
 scout.config = _config
+scout.metrics = InMemoryMetrics()
+scout.role_index = RoleIndex()
 
 
 @scout.listen('on_guild_role_update')
 async def update_stored_roles(before: discord.Role, after: discord.Role):
-    with Session(scout.engine) as session:
-        role_db = db.get_role(before.id, snowflake_only=True, session=session)
+    async with scout.session_maker() as session:
+        role_db = await aiodb.get_role(before.id, snowflake_only=True, session=session)
         if before.id != after.id and role_db:
             role_db.snowflake = after.id
-            session.commit()
+            await session.commit()
+            scout.role_index.update_role(before.id, after.id)
 
 
 @scout.listen('on_guild_role_delete')
 async def remove_stored_roles(role: discord.Role):
-    with Session(scout.engine) as session:
-        db.remove_role(role.id, snowflake_only=True, session=session)
+    await scout.remove_role(role)
 
 
 @scout.listen('on_guild_remove')
 async def remove_guild_info(guild: discord.Guild):
-    with Session(scout.engine) as session:
-        db.remove_guild(guild.id, snowflake_only=True, session=session)
+    async with scout.session_maker() as session:
+        try:
+            await aiodb.remove_guild(guild.id, snowflake_only=True, session=session)
+        except NotFound:
+            return
+        await session.commit()
+    scout.role_index.remove_guild(guild.id)
 
 
 @scout.hybrid_command()  # type: ignore
@@ -122,4 +249,11 @@ async def personality_set(ctx, personality: str):
     await ctx.send(await scout.translator.translate_response("personality-set"))
 
 
+@scout.hybrid_command()  # type: ignore
+@commands.is_owner()
+async def reload_translations(ctx):
+    changed = await scout.reload_translations()
+    await ctx.send(await scout.translator.translate_response("translations-reloaded", count=len(changed)))
+
+
 scout.run(scout.config["DISCORD_API_KEY"])
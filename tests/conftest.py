@@ -0,0 +1,40 @@
+import contextlib
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from Scout.database import db
+from Scout.database.base import Base
+
+
+@pytest.fixture
+def engine():
+    engine = db.db_connect("sqlite", None, None, {'user': None, 'password': None}, {'host': None, 'port': None})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def count_statements(engine):
+    """Returns a context manager that counts the statements run within it, yielding a list of them."""
+    @contextlib.contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(_conn, _cursor, statement, _parameters, _context, _executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return counter
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+from sqlalchemy import make_url, text
+
+from Scout.database import db
+
+
+def connect(dialect, driver, table, login=None, connect_info=None, **kwargs):
+    return db.db_connect(dialect, driver, table, login or {'user': None, 'password': None},
+                         connect_info or {'host': None, 'port': None}, pool={'size': 1, 'max_overflow': 0}, **kwargs)
+
+
+def read_twice(engine, statement):
+    """Reads a setting, returns the connection to the pool and then reads it again on the same connection."""
+    values = []
+    for _ in range(2):
+        with engine.connect() as connection:
+            values.append(connection.execute(text(statement)).scalar())
+    assert engine.pool.checkedout() == 0
+    return values
+
+
+@pytest.mark.parametrize("driver, expected", [
+    (None, {"options": "-c statement_timeout=1500"}),
+    ("psycopg", {"options": "-c statement_timeout=1500"}),
+    ("asyncpg", {"server_settings": {"statement_timeout": "1500"}}),
+])
+def test_postgres_statement_timeout_is_a_startup_option(driver, expected):
+    assert db._connect_args("postgresql", driver, 1500) == expected
+
+
+def test_no_connect_args_without_a_timeout():
+    assert db._connect_args("postgresql", "psycopg", None) == {}
+    assert db._connect_args("sqlite", None, 1500) == {}
+
+
+def test_sqlite_settings_survive_checkin(tmp_path):
+    engine = connect("sqlite", None, str(tmp_path / "scout.db"), statement_timeout=1500)
+    try:
+        assert read_twice(engine, "PRAGMA busy_timeout") == [1500, 1500]
+        assert read_twice(engine, "PRAGMA journal_mode") == ["wal", "wal"]
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.skipif("SCOUT_TEST_POSTGRES_URL" not in os.environ, reason="SCOUT_TEST_POSTGRES_URL is not set")
+def test_postgres_statement_timeout_survives_checkin():
+    url = make_url(os.environ["SCOUT_TEST_POSTGRES_URL"])
+    engine = connect(url.get_backend_name(), url.get_driver_name(), url.database,
+                     {'user': url.username, 'password': url.password}, {'host': url.host, 'port': url.port},
+                     statement_timeout=1500)
+    try:
+        assert read_twice(engine, "SHOW statement_timeout") == ["1500ms", "1500ms"]
+    finally:
+        engine.dispose()
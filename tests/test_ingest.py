@@ -0,0 +1,99 @@
+import gzip
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import Scout.database.models as models
+from Scout.core.nationstates import ingest
+from Scout.ns_api import dump
+
+NATIONS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<NATIONS api_version="12">
+<NATION>
+<NAME>Stayed</NAME>
+<REGION>Sun's Reach</REGION>
+<FREEDOM><CIVILRIGHTS>Good</CIVILRIGHTS></FREEDOM>
+</NATION>
+<NATION>
+<NAME>Moved Away</NAME>
+<REGION>Elsewhere</REGION>
+</NATION>
+<NATION>
+<NAME>Unknown</NAME>
+<REGION>Nowhere</REGION>
+</NATION>
+<NATION>
+<NAME>No Region</NAME>
+</NATION>
+</NATIONS>
+"""
+
+REGIONS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<REGIONS>
+<REGION>
+<NAME>Sun's Reach</NAME>
+<NATIONS>stayed:</NATIONS>
+<OFFICERS><OFFICER><NATION>someone_else</NATION></OFFICER></OFFICERS>
+</REGION>
+<REGION>
+<NAME>Elsewhere</NAME>
+<NATIONS>moved_away:unknown</NATIONS>
+</REGION>
+<REGION>
+<NAME>Empty</NAME>
+<NATIONS></NATIONS>
+</REGION>
+</REGIONS>
+"""
+
+
+@pytest.fixture
+def nations_dump(tmp_path):
+    path = tmp_path / "nations.xml.gz"
+    path.write_bytes(gzip.compress(NATIONS))
+    return path
+
+
+@pytest.fixture
+def regions_dump(tmp_path):
+    path = tmp_path / "regions.xml.gz"
+    path.write_bytes(gzip.compress(REGIONS))
+    return path
+
+
+def test_iter_records_only_reads_direct_children(nations_dump):
+    assert list(dump.iter_records(nations_dump, "NATION", ("name", "civilrights"))) == [
+        {"name": "Stayed"}, {"name": "Moved Away"}, {"name": "Unknown"}, {"name": "No Region"}]
+
+
+def test_iter_nations(nations_dump):
+    assert list(dump.iter_nations(nations_dump)) == [
+        ("Stayed", "Sun's Reach"), ("Moved Away", "Elsewhere"), ("Unknown", "Nowhere")]
+
+
+def test_iter_regions(regions_dump):
+    assert list(dump.iter_regions(regions_dump)) == [
+        ("stayed", "Sun's Reach"), ("moved_away", "Elsewhere"), ("unknown", "Elsewhere")]
+
+
+def test_iter_records_reads_open_files(regions_dump):
+    with open(regions_dump, 'rb') as file:
+        assert [r["name"] for r in dump.iter_records(file, "REGION", ("name",))] == ["Sun's Reach", "Elsewhere",
+                                                                                     "Empty"]
+
+
+@pytest.mark.parametrize("dump_name", ["nations_dump", "regions_dump"])
+def test_ingest_dump(engine, request, dump_name):
+    with Session(engine) as session:
+        region = models.Region(name="Sun's Reach")
+        session.add_all([models.Nation(name="Stayed", region=region), models.Nation(name="Moved Away", region=region)])
+        session.commit()
+
+    assert ingest.ingest_dump(request.getfixturevalue(dump_name), engine, batch_size=1) == 1
+
+    with Session(engine) as session:
+        residency = dict(session.execute(select(models.Nation.name, models.Region.name)
+                                         .join(models.Nation.region)).all())
+        assert residency == {"Stayed": "Sun's Reach", "Moved Away": "Elsewhere"}
+        assert session.scalar(select(models.Region).where(models.Region.name == "Nowhere")) is None
@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+from Scout.core.nationstates.joinqueue import JoinQueue
+
+
+def member(snowflake: int, guild):
+    return SimpleNamespace(id=snowflake, guild=guild)
+
+
+def test_batches_by_window():
+    guild_a, guild_b = SimpleNamespace(id=1), SimpleNamespace(id=2)
+    batches = []
+
+    async def handler(guild, members):
+        batches.append((guild.id, [m.id for m in members]))
+
+    async def run():
+        queue = JoinQueue(handler, window=0.05, workers=1)
+        queue.start()
+        await queue.put(member(10, guild_a))
+        await queue.put(member(20, guild_b))
+        await queue.put(member(11, guild_a))
+        await asyncio.sleep(0.01)
+        assert not batches
+        await asyncio.sleep(0.1)
+        await queue.put(member(12, guild_a))
+        await asyncio.sleep(0.1)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert batches == [(1, [10, 11]), (2, [20]), (1, [12])]
+
+
+def test_batches_by_max_batch():
+    guild = SimpleNamespace(id=1)
+    batches = []
+
+    async def handler(_guild, members):
+        batches.append([m.id for m in members])
+
+    async def run():
+        queue = JoinQueue(handler, window=10, max_batch=2, workers=1)
+        queue.start()
+        for snowflake in range(5):
+            await queue.put(member(snowflake, guild))
+        await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(run())
+    # The last member is still waiting for the window to close when the queue is stopped.
+    assert batches == [[0, 1], [2, 3]]
+
+
+def test_backpressure():
+    guilds = [SimpleNamespace(id=snowflake) for snowflake in range(4)]
+    handled = []
+
+    async def run():
+        blocked = asyncio.Event()
+
+        async def handler(guild, _members):
+            await blocked.wait()
+            handled.append(guild.id)
+
+        queue = JoinQueue(handler, max_batch=1, workers=1, max_batches=2)
+        queue.start()
+        # The worker takes the first batch, and the next two fill the queue.
+        for guild in guilds[:3]:
+            await asyncio.wait_for(queue.put(member(0, guild)), 0.1)
+        await asyncio.sleep(0)
+        put = asyncio.create_task(queue.put(member(0, guilds[3])))
+        await asyncio.sleep(0.05)
+        assert not put.done()
+
+        blocked.set()
+        await asyncio.wait_for(put, 0.1)
+        await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert handled == [0, 1, 2, 3]
+
+
+def test_stop():
+    guild = SimpleNamespace(id=1)
+    calls = []
+
+    async def handler(guild, members):
+        calls.append(guild.id)
+        if len(calls) == 1:
+            raise RuntimeError("handler failed")
+        await asyncio.sleep(10)
+
+    async def run():
+        queue = JoinQueue(handler, max_batch=1, workers=2)
+        queue.start()
+        queue.start()
+        assert len(queue._workers) == 2
+        # A failing batch is logged and doesn't take its worker down.
+        await queue.put(member(0, guild))
+        await queue.put(member(1, guild))
+        await asyncio.sleep(0.01)
+        workers = list(queue._workers)
+        assert not any(worker.done() for worker in workers)
+
+        queue.max_batch = 10
+        await queue.put(member(2, guild))
+        await asyncio.wait_for(queue.stop(), 0.1)
+        assert all(worker.cancelled() for worker in workers)
+        assert not queue._workers and not queue._timers and not queue._pending
+
+    asyncio.run(run())
+    assert calls == [1, 1]
@@ -0,0 +1,71 @@
+import pytest
+
+import Scout.database.models as models
+from Scout.database import db
+
+
+def add_user(session, snowflake: int, nations: int) -> models.User:
+    user = models.User(snowflake=snowflake)
+    for i in range(nations):
+        region = models.Region(name="region_{}_{}".format(snowflake, i))
+        user.nations.add(models.Nation(name="nation_{}_{}".format(snowflake, i), region=region))
+    session.add(user)
+    session.commit()
+    session.expunge_all()
+    return user
+
+
+@pytest.mark.parametrize("nations", [1, 10])
+def test_user_nations_profile_is_not_n_plus_one(session, count_statements, nations):
+    add_user(session, 1, nations)
+
+    with count_statements() as statements:
+        user = db.get_user(1, snowflake_only=True, load=("user_nations",), session=session)
+        regions = {nation.region.name for nation in user.nations}
+
+    assert len(regions) == nations
+    assert len(statements) == 2
+
+
+def test_bulk_users_are_not_n_plus_one(session, count_statements):
+    for snowflake in range(1, 6):
+        add_user(session, snowflake, 3)
+
+    with count_statements() as statements:
+        users = db.get_users_by_snowflakes(range(1, 6), session=session)
+        regions = {nation.region.name for user in users.values() for nation in user.nations}
+
+    assert len(regions) == 15
+    assert len(statements) == 2
+
+
+def test_nation_profiles(session, count_statements):
+    add_user(session, 1, 1)
+
+    with count_statements() as statements:
+        nation = db.get_nation("nation_1_0", load=("nation_region", "nation_users"), session=session)
+        assert nation.region.name == "region_1_0"
+        assert {user.snowflake for user in nation.users} == {1}
+
+    assert len(statements) == 2
+
+
+def test_role_meanings_profile(session, count_statements):
+    guild = models.Guild(snowflake=1)
+    role = models.Role(snowflake=2, guild=guild)
+    role.meanings.update({models.Meaning(meaning="verified"), models.Meaning(meaning="resident")})
+    session.add(role)
+    session.commit()
+    session.expunge_all()
+
+    with count_statements() as statements:
+        role = db.get_guildrole_with_meaning(1, "verified", load=("role_meanings",), session=session)
+        assert {meaning.meaning for meaning in role.meanings} == {"verified", "resident"}
+
+    # The guild, the meaning, the role and its meanings.
+    assert len(statements) == 4
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        db.loader_options(("nope",))
@@ -0,0 +1,136 @@
+import asyncio
+import gc
+import pickle
+import shutil
+import sys
+import weakref
+
+import pytest
+
+from Scout.localization import ResourceCache, ScoutTranslator
+
+
+@pytest.fixture
+def translations(tmp_path, monkeypatch):
+    """Creates a translations tree in a temporary directory and runs the test from there."""
+    for locale in ("en-US", "fr"):
+        directory = tmp_path / "translations" / "scout" / locale
+        directory.mkdir(parents=True)
+        (directory / "responses.ftl").write_text("hi = hi {}\n".format(locale))
+        (directory / "commands.ftl").write_text("sync = sync\n")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "translations"
+
+
+class Missing:
+    pass
+
+
+@pytest.mark.parametrize("contents", [b"", b"not a pickle", pickle.dumps(("0.19.0", {}))[:-3]])
+def test_unreadable_cache_is_discarded(tmp_path, contents):
+    path = tmp_path / "cache.pickle"
+    path.write_bytes(contents)
+    assert len(ResourceCache(path)._entries) == 0
+
+
+def test_cache_referencing_missing_classes_is_discarded(tmp_path, monkeypatch):
+    path = tmp_path / "cache.pickle"
+    path.write_bytes(pickle.dumps(Missing()))
+    monkeypatch.delattr(sys.modules[__name__], "Missing")
+    assert len(ResourceCache(path)._entries) == 0
+
+
+def translate_all(translator: ScoutTranslator) -> list[str]:
+    async def translate():
+        return [await translator.translate_response("hi", locale=locale) for locale in ("en-US", "fr")]
+    return asyncio.run(translate())
+
+
+def test_cache_is_reused_and_pruned(translations, tmp_path):
+    cache_file = tmp_path / "cache.pickle"
+    translator = ScoutTranslator("scout", cache_file=str(cache_file))
+    asyncio.run(translator.load())
+    cache = translator._localization.resource_loader.cache
+    # Loading doesn't parse anything, the files are only parsed once their locale is used.
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert translate_all(translator) == ["hi en-US", "hi fr"]
+    assert (cache.hits, cache.misses) == (0, 4)
+    asyncio.run(translator.unload())
+
+    (translations / "scout" / "fr" / "commands.ftl").unlink()
+    translator = ScoutTranslator("scout", cache_file=str(cache_file))
+    asyncio.run(translator.load())
+    assert len(pickle.loads(cache_file.read_bytes())[1]) == 3
+    assert translate_all(translator) == ["hi en-US", "hi fr"]
+    cache = translator._localization.resource_loader.cache
+    assert (cache.hits, cache.misses) == (3, 0)
+
+
+def test_lazily_created_bundles_do_not_save(translations, tmp_path):
+    cache_file = tmp_path / "cache.pickle"
+    translator = ScoutTranslator("scout", cache_file=str(cache_file))
+    asyncio.run(translator.load())
+    assert not cache_file.exists()
+
+    assert asyncio.run(translator.translate_response("hi", locale="fr")) == "hi fr"
+    assert not cache_file.exists()
+    # Even when nothing changed, a reload saves what has been parsed since.
+    assert asyncio.run(translator.reload()) == set()
+    assert len(pickle.loads(cache_file.read_bytes())[1]) == 2
+
+
+def test_formatted_messages_are_cached(translations):
+    translator = ScoutTranslator("scout")
+    asyncio.run(translator.load())
+
+    async def translate():
+        return [await translator.translate_response("hi", locale="fr") for _ in range(3)]
+
+    assert asyncio.run(translate()) == ["hi fr"] * 3
+    assert (translator.rendered.hits, translator.rendered.misses) == (2, 1)
+    translator.set_personality("scout")
+    assert len(translator.rendered) == 0
+
+
+def test_evicted_bundles_are_freed(translations):
+    translator = ScoutTranslator("scout", max_locales=1, render_cache_size=0)
+    asyncio.run(translator.load())
+    bundles = translator._localization._personalities["scout"]._locales
+
+    async def translate(locale):
+        return await translator.translate_response("hi", locale=locale)
+
+    assert asyncio.run(translate("fr")) == "hi fr"
+    evicted = [weakref.ref(bundles.get("fr")), weakref.ref(bundles.get("fr").get_message("hi"))]
+    assert asyncio.run(translate("en-US")) == "hi en-US"
+    gc.collect()
+    assert [ref() for ref in evicted] == [None, None]
+    assert asyncio.run(translate("fr")) == "hi fr"
+
+
+def test_reload_only_changed_files(translations):
+    translator = ScoutTranslator("scout")
+    asyncio.run(translator.load())
+    bundles = translator._localization._personalities["scout"]
+    assert asyncio.run(translator.translate_response("hi", locale="en-US")) == "hi en-US"
+    english = bundles._locales.get("en-US")
+
+    (translations / "scout" / "fr" / "responses.ftl").write_text("hi = salut\n")
+    assert asyncio.run(translator.reload()) == {"scout/fr/responses.ftl"}
+    assert asyncio.run(translator.reload()) == set()
+
+    bundles = translator._localization._personalities["scout"]
+    assert bundles._locales.get("en-US") is english
+    assert asyncio.run(translator.translate_response("hi", locale="fr")) == "salut"
+
+
+def test_reload_keeps_translations_if_personality_is_removed(translations, caplog):
+    translator = ScoutTranslator("scout")
+    asyncio.run(translator.load())
+    assert asyncio.run(translator.translate_response("hi", locale="fr", personality="scout")) == "hi fr"
+    translator.rendered.clear()
+    shutil.rmtree(translations / "scout")
+
+    assert asyncio.run(translator.reload()) == set()
+    assert "scout no longer exists" in caplog.text
+    assert asyncio.run(translator.translate_response("hi", locale="fr")) == "hi fr"
@@ -0,0 +1,34 @@
+from Scout.lru import LRUCache
+from Scout.ns_api.cache import TTLCache
+
+
+def test_least_recently_used_is_evicted():
+    evicted = []
+    cache = LRUCache(2, on_evict=lambda key, value: evicted.append((key, value)))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert list(cache.keys()) == ["a", "c"]
+    assert evicted == [("b", 2)]
+
+
+def test_none_is_cached():
+    cache = LRUCache(None)
+    missing = object()
+    cache.set("a", None)
+    assert cache.get("a", missing) is None
+    assert cache.get("b", missing) is missing
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+
+def test_ttl_cache_expires():
+    now = [0.0]
+    cache = TTLCache(2, ttl=10, timer=lambda: now[0])
+    cache.set("a", 1)
+    assert "a" in cache and cache.get("a") == 1
+    now[0] = 10
+    assert "a" not in cache and cache.get("a") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
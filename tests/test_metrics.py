@@ -0,0 +1,42 @@
+from Scout.metrics import InMemoryMetrics, PrometheusExporter
+
+
+def test_render():
+    metrics = InMemoryMetrics(buckets=(0.1, 1.0))
+    metrics.increment("ns_requests", shard="nations")
+    metrics.increment("ns_requests", 2, shard="nations")
+    metrics.increment("ns_requests", shard="region")
+    metrics.increment("ns_errors")
+    metrics.gauge("ns_waiting", 3, priority="INTERACTIVE")
+    metrics.observe("ns_latency", 0.05)
+    metrics.observe("ns_latency", 0.5)
+    metrics.observe("ns_latency", 5)
+
+    assert PrometheusExporter(metrics).render() == "\n".join([
+        "# TYPE scout_ns_errors counter",
+        "scout_ns_errors 1.0",
+        "# TYPE scout_ns_requests counter",
+        'scout_ns_requests{shard="nations"} 3.0',
+        'scout_ns_requests{shard="region"} 1.0',
+        "# TYPE scout_ns_waiting gauge",
+        'scout_ns_waiting{priority="INTERACTIVE"} 3.0',
+        "# TYPE scout_ns_latency histogram",
+        'scout_ns_latency_bucket{le="0.1"} 1',
+        'scout_ns_latency_bucket{le="1.0"} 2',
+        'scout_ns_latency_bucket{le="+Inf"} 3',
+        "scout_ns_latency_sum 5.55",
+        "scout_ns_latency_count 3",
+    ]) + "\n"
+
+
+def test_label_escaping():
+    metrics = InMemoryMetrics()
+    metrics.increment("errors", reason='bad "quote"\\\nnext line', code=404)
+
+    assert PrometheusExporter(metrics, prefix="").render() == (
+        "# TYPE errors counter\n"
+        'errors{code="404",reason="bad \\"quote\\"\\\\\\nnext line"} 1.0\n')
+
+
+def test_render_empty():
+    assert PrometheusExporter(InMemoryMetrics()).render() == "\n"
@@ -0,0 +1,102 @@
+import asyncio
+
+from Scout.ns_api.cache import PersistentCache
+from Scout.ns_api.ns import NationStatesClient
+
+
+def make_client(tmp_path) -> tuple[NationStatesClient, list[str]]:
+    client = NationStatesClient(None, persistent_cache=PersistentCache(tmp_path / "cache.db"))  # type: ignore
+    requests = []
+
+    async def make_request(url, _headers, _shards, *, priority):
+        requests.append(url)
+        await asyncio.sleep(0.01)
+        return {"name": "fresh"}
+
+    client._make_request = make_request  # type: ignore
+    return client, requests
+
+
+def test_identical_requests_are_coalesced(tmp_path):
+    client, requests = make_client(tmp_path)
+
+    async def run():
+        return await asyncio.gather(*(client._fetch("https://example.com/?a=b", ("name",)) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"name": "fresh"}] * 5
+    assert len(requests) == 1
+    client.persistent_cache.close()
+
+
+def test_uncached_request_is_not_coalesced_with_a_cached_one(tmp_path):
+    client, requests = make_client(tmp_path)
+    url = "https://example.com/?a=b"
+
+    async def run():
+        await client.persistent_cache.set(client._cache_key(url, ("name",)), {"name": "stale"})
+        return await asyncio.gather(client._fetch(url, ("name",)), client._fetch(url, ("name",), use_cache=False))
+
+    assert asyncio.run(run()) == [{"name": "stale"}, {"name": "fresh"}]
+    assert len(requests) == 1
+    client.persistent_cache.close()
+
+
+def test_invalidate_nation(tmp_path):
+    client, requests = make_client(tmp_path)
+
+    async def make_request(url, _headers, _shards, *, priority):
+        requests.append(url)
+        return {"name": "Testlandia", "region": "Region {}".format(len(requests))}
+
+    client._make_request = make_request  # type: ignore
+
+    async def run():
+        regions = [(await client.get_nation("Testlandia")).region for _ in range(2)]
+        await client.invalidate_nation("testlandia")
+        regions.append((await client.get_nation("testlandia")).region)
+        return regions
+
+    # Both the in-memory and the persistent cache are cleared.
+    assert asyncio.run(run()) == ["Region 1", "Region 1", "Region 2"]
+    assert len(requests) == 2
+    client.persistent_cache.close()
+
+
+class FakeVersionResponse:
+    status = 200
+    headers: dict[str, str] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_exc):
+        pass
+
+    async def text(self):
+        return "12"
+
+
+class FakeVersionSession:
+    def __init__(self, requests: list[str]):
+        self.requests = requests
+
+    def get(self, url, *, headers):
+        self.requests.append(url)
+        return FakeVersionResponse()
+
+
+def test_version_is_only_cached_in_memory(tmp_path):
+    requests = []
+    session = FakeVersionSession(requests)
+    persistent_cache = PersistentCache(tmp_path / "cache.db")
+
+    async def run():
+        client = NationStatesClient(session, persistent_cache=persistent_cache)  # type: ignore
+        versions = [await client._get_version() for _ in range(2)]
+        versions.append(await NationStatesClient(session, persistent_cache=persistent_cache)._get_version())
+        return versions
+
+    # A new client, such as after a restart, asks NationStates again.
+    assert asyncio.run(run()) == [12, 12, 12]
+    assert len(requests) == 2
+    persistent_cache.close()
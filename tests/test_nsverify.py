@@ -0,0 +1,232 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+from sqlalchemy import select
+
+import Scout.database.models as models
+from Scout.core.nationstates import nsverify
+from Scout.database import db, aiodb
+from Scout.database.base import Base
+from Scout.database.roleindex import RoleIndex
+from Scout.metrics import InMemoryMetrics
+
+
+class FakeClient:
+    """Answers region and nation lookups from dicts, recording whether each was allowed to use the cache."""
+
+    def __init__(self, region_nations: dict[str, list[str]], nation_regions: dict[str, str]):
+        self.region_nations = region_nations
+        self.nation_regions = nation_regions
+        self.use_cache: list[bool] = []
+        self.invalidated: list[tuple[str, str]] = []
+
+    async def query(self, *, region, shards, use_cache=True, priority=None):
+        self.use_cache.append(use_cache)
+        return {"nations": self.region_nations[region]}
+
+    async def get_nation(self, nation, *, use_cache=True, priority=None):
+        self.use_cache.append(use_cache)
+        return SimpleNamespace(region=self.nation_regions[nation])
+
+    async def invalidate_nation(self, nation):
+        self.invalidated.append(("nation", nation))
+
+    async def invalidate_region(self, region):
+        self.invalidated.append(("region", region))
+
+
+async def create_session_maker():
+    engine = db.db_connect_async("sqlite", None, None, {'user': None, 'password': None},
+                                 {'host': None, 'port': None})
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return engine, aiodb.sessionmaker(engine)
+
+
+class FakeMember:
+    """A guild member whose roles are only changed by `edit`, which can be made to fail."""
+
+    def __init__(self, snowflake: int, guild, roles: set[int], *, forbidden: bool = False):
+        self.id = snowflake
+        self.guild = guild
+        self.roles = [SimpleNamespace(id=r) for r in roles | {guild.id}]
+        self.forbidden = forbidden
+        self.edits = 0
+        self.sent: list[set[int]] = []
+
+    async def edit(self, *, roles):
+        self.edits += 1
+        self.sent.append({r.id for r in roles})
+        if self.forbidden:
+            raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+        self.roles = [SimpleNamespace(id=r.id) for r in roles] + [SimpleNamespace(id=self.guild.id)]
+
+
+class FakeGuild:
+    def __init__(self, snowflake: int, *, chunked: bool = True):
+        self.id = snowflake
+        self.chunked = chunked
+        self.chunks = 0
+        self.members: list[FakeMember] = []
+
+    def get_member(self, snowflake: int):
+        return next((member for member in self.members if member.id == snowflake), None)
+
+    async def chunk(self):
+        self.chunks += 1
+        self.chunked = True
+
+
+def reconcile(forbidden: set[int] = frozenset(), *, chunked: bool = True):
+    """Reconciles a guild with a verified (10) and resident (11) role, returning it, the result and the metrics."""
+    async def run():
+        engine, session_maker = await create_session_maker()
+        async with session_maker() as session:
+            linked = models.Region(name="Sun's Reach")
+            elsewhere = models.Region(name="Elsewhere")
+            session.add_all([models.User(snowflake=100, nations={models.Nation(name="Home", region=linked)}),
+                             models.User(snowflake=101, nations={models.Nation(name="Arrived", region=linked)}),
+                             models.User(snowflake=102, nations={models.Nation(name="Away", region=elsewhere)}),
+                             models.User(snowflake=200, nations={models.Nation(name="Absent", region=linked)})])
+            await session.commit()
+            linked_id = linked.id
+
+        role_index = RoleIndex()
+        role_index.add(1, nsverify.VERIFIED, 10)
+        role_index.add(1, nsverify.RESIDENT, 11)
+        role_index.link_region(1, linked_id)
+        metrics = InMemoryMetrics()
+        cog = nsverify.NSVerify(SimpleNamespace(session_maker=session_maker, role_index=role_index, metrics=metrics))
+
+        guild = FakeGuild(1, chunked=chunked)
+        guild.members = [FakeMember(100, guild, {11, 50}),  # Already has the right role.
+                         FakeMember(101, guild, {50}),  # Should be given the resident role.
+                         FakeMember(102, guild, {11}),  # Moved away, so should be verified instead.
+                         FakeMember(103, guild, {10}),  # Has no nations any more.
+                         FakeMember(104, guild, {50})]  # Has nothing to do with NSVerify.
+        for member in guild.members:
+            member.forbidden = member.id in forbidden
+        changed = await cog.reconcile_guild_roles(guild)
+        await engine.dispose()
+        return guild, changed, metrics
+
+    return asyncio.run(run())
+
+
+def roles_of(guild) -> dict[int, set[int]]:
+    return {member.id: {r.id for r in member.roles} - {guild.id} for member in guild.members}
+
+
+def test_reconcile_guild_roles():
+    guild, changed, metrics = reconcile(chunked=False)
+    assert guild.chunks == 1
+    assert changed == 3
+    assert roles_of(guild) == {100: {11, 50}, 101: {11, 50}, 102: {10}, 103: set(), 104: {50}}
+    assert {m.id: m.edits for m in guild.members} == {100: 0, 101: 1, 102: 1, 103: 1, 104: 0}
+    assert metrics.counters[("nsverify_role_edits_attempted", ())] == 3
+    assert metrics.counters[("nsverify_role_edits_skipped", ())] == 1
+
+
+def test_reconcile_guild_roles_partial_failure():
+    guild, changed, metrics = reconcile({101})
+    assert guild.chunks == 0
+    assert changed == 2
+    assert roles_of(guild) == {100: {11, 50}, 101: {50}, 102: {10}, 103: set(), 104: {50}}
+    assert metrics.counters[("nsverify_role_edits_attempted", ())] == 3
+
+
+def test_sync_residency(monkeypatch):
+    updates = []
+    update_nation_regions = aiodb.update_nation_regions
+
+    async def record_updates(nation_regions, *, session):
+        updates.append(dict(nation_regions))
+        await update_nation_regions(nation_regions, session=session)
+
+    monkeypatch.setattr(aiodb, "update_nation_regions", record_updates)
+
+    async def run():
+        engine, session_maker = await create_session_maker()
+        async with session_maker() as session:
+            linked = models.Region(name="Sun's Reach")
+            elsewhere = models.Region(name="Elsewhere")
+            session.add(models.Guild(snowflake=1, regions={linked}))
+            session.add_all([models.Nation(name="Stayed", region=linked),
+                             models.Nation(name="Moved Away", region=linked),
+                             models.Nation(name="Still Here", region=linked),
+                             models.Nation(name="Unlinked", region=elsewhere)])
+            await session.commit()
+
+        client = FakeClient({"Sun's Reach": ["stayed"]},
+                            # Still Here is missing from the region's list, but NationStates still has it there.
+                            {"Moved Away": "Elsewhere", "Still Here": "sun's reach"})
+        cog = nsverify.NSVerify(SimpleNamespace(session_maker=session_maker, get_user=lambda _: None))
+        cog.ns_client = client
+        await cog.sync_residency.coro(cog)
+
+        async with session_maker() as session:
+            regions = dict((await session.execute(select(models.Nation.name, models.Region.name)
+                                                  .join(models.Nation.region))).all())
+        await engine.dispose()
+        return client, regions
+
+    client, regions = asyncio.run(run())
+    assert client.use_cache and not any(client.use_cache)
+    assert regions == {"Stayed": "Sun's Reach", "Moved Away": "Elsewhere", "Still Here": "Sun's Reach",
+                       "Unlinked": "Elsewhere"}
+    assert len(updates) == 1 and len(updates[0]) == 1
+    assert client.invalidated == [("nation", "Moved Away")]
+
+
+def test_apply_nsv_roles():
+    metrics = InMemoryMetrics()
+    cog = nsverify.NSVerify(SimpleNamespace(metrics=metrics))
+    guild = FakeGuild(1)
+    member = FakeMember(100, guild, {10, 50})
+
+    async def run():
+        assert not await cog.apply_nsv_roles(member, {10}, {10, 11})
+        assert await cog.apply_nsv_roles(member, {11}, {10, 11})
+        assert not await cog.apply_nsv_roles(member, {11}, {10, 11})
+        assert await cog.apply_nsv_roles(member, set(), {10, 11})
+
+    asyncio.run(run())
+    # Roles NSVerify doesn't manage are kept, and the default role is never sent.
+    assert member.sent == [{11, 50}, {50}]
+    assert metrics.counters[("nsverify_role_edits_attempted", ())] == 2
+    assert metrics.counters[("nsverify_role_edits_skipped", ())] == 2
+
+
+def test_update_nsv_roles(monkeypatch):
+    monkeypatch.setattr(nsverify, "ROLE_EDIT_CONCURRENCY", 2)
+    role_index = RoleIndex()
+    guilds = [FakeGuild(snowflake) for snowflake in range(1, 6)]
+    for guild in guilds:
+        role_index.add(guild.id, nsverify.VERIFIED, guild.id * 10)
+        role_index.add(guild.id, nsverify.RESIDENT, guild.id * 10 + 1)
+        if guild.id != 5:
+            guild.members = [FakeMember(100, guild, set(), forbidden=guild.id == 2)]
+    role_index.link_region(1, 7)
+    cog = nsverify.NSVerify(SimpleNamespace(guilds=guilds, role_index=role_index, metrics=InMemoryMetrics()))
+
+    editing = 0
+    most_editing = 0
+
+    async def edit(member, roles):
+        nonlocal editing, most_editing
+        editing += 1
+        most_editing = max(most_editing, editing)
+        await asyncio.sleep(0.01)
+        editing -= 1
+        await FakeMember.edit(member, roles=roles)
+
+    for guild in guilds:
+        for member in guild.members:
+            member.edit = lambda *, roles, member=member: edit(member, roles)
+
+    asyncio.run(cog.update_nsv_roles(SimpleNamespace(id=100), {7}))
+    # Guild 2 refusing the edit doesn't stop the others, and guild 5 has no such member.
+    assert {guild.id: roles_of(guild) for guild in guilds} == {
+        1: {100: {11}}, 2: {100: set()}, 3: {100: {30}}, 4: {100: {40}}, 5: {}}
+    assert most_editing == 2
@@ -0,0 +1,56 @@
+from Scout.ns_api.parser import ShardParser, convert_shards
+
+REGION = (b'<REGION id="sun\'s_reach"><NAME>Sun\'s Reach</NAME><NUMNATIONS>3</NUMNATIONS>'
+          b'<NATIONS>one:two:three</NATIONS><OFFICERS><OFFICER><NATION>one</NATION></OFFICER></OFFICERS>'
+          b'<DELEGATE>one</DELEGATE></REGION>')
+
+
+def parse(shards: list[str], data: bytes, chunk_size: int) -> ShardParser:
+    parser = ShardParser(shards)
+    for i in range(0, len(data), chunk_size):
+        parser.feed(data[i:i + chunk_size])
+    parser.close()
+    return parser
+
+
+def test_multiple_shards():
+    # However the response is split up, only the requested shards that are direct children of the root are kept.
+    for chunk_size in (1, 7, len(REGION)):
+        parser = parse(["Nations", "numnations", "nation", "delegate"], REGION, chunk_size)
+        assert not parser.failed
+        assert parser.values == {"nations": "one:two:three", "numnations": "3", "delegate": "one"}
+        assert not parser.complete
+
+    assert convert_shards(parse(["nations", "numnations"], REGION, len(REGION)).values) == {
+        "nations": ("one", "two", "three"), "numnations": 3}
+
+
+def test_complete():
+    parser = ShardParser(["name", "numnations"])
+    parser.feed(REGION[:REGION.index(b"<NATIONS>")])
+    assert parser.complete
+    assert parser.values == {"name": "Sun's Reach", "numnations": "3"}
+
+
+def test_empty_shard():
+    parser = parse(["nations"], b"<REGION><NATIONS></NATIONS></REGION>", 64)
+    assert parser.values == {"nations": ""}
+    assert convert_shards(parser.values) == {"nations": ()}
+
+
+def test_malformed():
+    # Shards read before the error are still returned, and nothing after it is parsed.
+    data = b"<REGION><NAME>Sun's Reach</NAME><NUMNATIONS>3</NUMNAT><DELEGATE>one</DELEGATE></REGION>"
+    parser = parse(["name", "numnations", "delegate"], data, 8)
+    assert parser.failed
+    assert parser.values == {"name": "Sun's Reach"}
+
+
+def test_not_xml():
+    parser = parse(["name"], b"<!DOCTYPE html><h1>Not Found</h1><p>", 64)
+    assert parser.failed
+    assert parser.values == {}
+
+    truncated = parse(["name", "numnations"], REGION[:REGION.index(b"<NATIONS>") - 3], 64)
+    assert truncated.failed
+    assert truncated.values == {"name": "Sun's Reach"}
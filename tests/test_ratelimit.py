@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from Scout.ns_api import ratelimit
+from Scout.ns_api.ratelimit import Allowable, RateLimiter, Priority
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the limiter's monotonic clock with one that only moves when `now` is set."""
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def send(limiter: RateLimiter, clock, *times: float):
+    """Sends a request through the limiter at each of the given times."""
+    async def run():
+        for at in times:
+            clock.now = at
+            await asyncio.wait_for(limiter.acquire(), 1)
+        limiter._dispatcher.cancel()
+    asyncio.run(run())
+
+
+async def served_order(limiter: RateLimiter, requests: list[tuple[str, Priority, float]]) -> list[str]:
+    """Queues each request after its delay on a saturated limiter, returning the order they were let through in."""
+    order = []
+
+    async def request(name: str, priority: Priority):
+        await limiter.acquire(priority)
+        order.append(name)
+
+    await limiter.acquire(Priority.INTERACTIVE)
+    tasks = []
+    for name, priority, delay in requests:
+        await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(request(name, priority)))
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_priority_order():
+    limiter = RateLimiter(1, 0.1, max_wait=10, background_reserve=0)
+    order = asyncio.run(served_order(limiter, [("background", Priority.BACKGROUND, 0),
+                                               ("normal", Priority.NORMAL, 0),
+                                               ("interactive", Priority.INTERACTIVE, 0)]))
+    assert order == ["interactive", "normal", "background"]
+
+
+def test_interactive_is_not_queued_behind_aged_background():
+    limiter = RateLimiter(1, 0.2, max_wait=0.05, background_reserve=0)
+    order = asyncio.run(served_order(limiter, [("background", Priority.BACKGROUND, 0),
+                                               ("interactive", Priority.INTERACTIVE, 0.1)]))
+    assert order == ["interactive", "background"]
+
+
+def test_aged_background_is_promoted_one_lane():
+    # The normal request arrives too late to age itself, so the background request is served first.
+    limiter = RateLimiter(1, 0.3, max_wait=0.1, background_reserve=0)
+    order = asyncio.run(served_order(limiter, [("background", Priority.BACKGROUND, 0),
+                                               ("normal", Priority.NORMAL, 0.25)]))
+    assert order == ["background", "normal"]
+
+
+def test_sliding_window(clock):
+    limiter = RateLimiter(3, 10)
+    send(limiter, clock, 0, 1, 2)
+    assert limiter.remaining == 0
+    assert limiter.delay(2) == 8
+
+    # Only the request sent at 0 has left the window.
+    clock.now = 10
+    assert limiter.remaining == 1
+    assert limiter.delay(10) == 0
+    assert limiter.delay(10, reserve=1) == 1
+    clock.now = 12
+    assert limiter.remaining == 3
+
+
+def test_update_retry_after(clock):
+    limiter = RateLimiter(3, 10)
+    send(limiter, clock, 0)
+    clock.now = 1
+    limiter.update(Allowable(3, 10), None, None, 20)
+    assert limiter.remaining == 0
+    assert limiter.delay(1) == 20
+    clock.now = 21
+    assert limiter.remaining == 3
+
+
+def test_update_no_remaining(clock):
+    limiter = RateLimiter(3, 10)
+    send(limiter, clock, 0)
+    clock.now = 1
+    limiter.update(Allowable(3, 10), 0, 5, None)
+    assert limiter.remaining == 0
+    assert limiter.delay(1) == 5
+
+
+def test_update_counts_unknown_requests(clock):
+    limiter = RateLimiter(5, 10)
+    send(limiter, clock, 0, 8)
+    clock.now = 9
+    # NationStates has seen four requests and its window clears in five seconds, so two were sent by someone else.
+    limiter.update(Allowable(5, 10), 1, 5, None)
+    assert list(limiter._sent) == [0, 4, 4, 8]
+    assert limiter.remaining == 1
+    clock.now = 14
+    assert limiter.remaining == 4
+
+    # The policy NationStates sends replaces ours, and nothing is added when we already know of every request.
+    limiter.update(Allowable(4, 10), 3, 4, None)
+    assert limiter.allowable == Allowable(4, 10)
+    assert list(limiter._sent) == [8]
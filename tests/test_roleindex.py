@@ -0,0 +1,73 @@
+from Scout.database.roleindex import RoleIndex
+
+
+def test_add():
+    index = RoleIndex()
+    index.add(1, "Verified", 10)
+    index.add(1, "resident", 11)
+
+    assert index.get(1, "verified") == 10
+    assert index.roles(1) == {"verified": 10, "resident": 11}
+    assert index.get(2, "verified") is None
+    assert len(index) == 2
+
+
+def test_replace():
+    index = RoleIndex()
+    index.add(1, "verified", 10)
+    index.add(1, "verified", 12)
+
+    assert index.get(1, "verified") == 12
+    assert len(index) == 1
+
+
+def test_same_role_for_two_meanings():
+    index = RoleIndex()
+    index.add(1, "verified", 10)
+    index.add(1, "resident", 10)
+    index.add(1, "verified", 12)
+
+    assert index.roles(1) == {"verified": 12, "resident": 10}
+    assert len(index) == 2
+
+
+def test_remove_role():
+    index = RoleIndex()
+    index.add(1, "verified", 10)
+    index.add(1, "resident", 10)
+    index.add(1, "other", 11)
+    index.remove_role(10)
+    index.remove_role(99)
+
+    assert index.roles(1) == {"other": 11}
+    assert len(index) == 1
+
+
+def test_update_role():
+    index = RoleIndex()
+    index.add(1, "verified", 10)
+    index.add(1, "resident", 10)
+    index.update_role(10, 11)
+    index.update_role(99, 100)
+
+    assert index.roles(1) == {"verified": 11, "resident": 11}
+    assert len(index) == 1
+
+    index.add(1, "verified", 12)
+    index.remove_role(11)
+    assert index.roles(1) == {"verified": 12}
+    assert len(index) == 1
+
+
+def test_regions_and_remove_guild():
+    index = RoleIndex()
+    index.add(1, "verified", 10)
+    index.link_region(1, 5)
+    index.link_region(1, 6)
+    index.unlink_region(1, 5)
+    assert index.regions(1) == {6}
+
+    index.remove_guild(1)
+    assert index.regions(1) == set()
+    assert index.roles(1) == {}
+    assert len(index) == 0
@@ -11,6 +11,9 @@ info = info
 
 set_personality = set_personality
 
+# The name of the reload_translations command
+reload_translations = reload_translations
+
 # Translation Commands
 set_server_language = set_server_language
 set_language = set_language
@@ -16,6 +16,9 @@ command-sync = Synced Slash Commands to Server!
 
 personality-set = "Personality has been set to the requested personality!"
 
+# $count (Int) - The amount of translation files that changed.
+translations-reloaded = Reloaded translations, { $count } file(s) changed!
+
 ## Translation Commands
 set_server_language = set_server_language
 set_language = set_language